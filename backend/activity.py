@@ -0,0 +1,73 @@
+"""Write-behind buffer for users' ``last_active`` timestamps."""
+import asyncio
+import logging
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+
+class LastActiveBuffer:
+    """Collects user touches in memory and writes them every ``interval`` seconds.
+
+    Touches of the same user within one window collapse into a single
+    ``UpdateOne``; all of them go out in one unordered ``bulk_write``. ``$max``
+    keeps a late flush from moving a timestamp backwards, and a failed or
+    cancelled flush puts its touches back for the next one.
+    """
+
+    def __init__(self, collection, interval=30.0):
+        self.collection = collection
+        self.interval = interval
+        self.flushes = 0
+        self.written = 0
+        self._pending = {}
+        self._task = None
+
+    def touch(self, user_id, at=None):
+        at = at or datetime.utcnow()
+        if at > self._pending.get(user_id, datetime.min):
+            self._pending[user_id] = at
+
+    async def flush(self):
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            await self.collection.bulk_write(
+                [UpdateOne({"id": user_id}, {"$max": {"last_active": at}}) for user_id, at in pending.items()],
+                ordered=False
+            )
+        except asyncio.CancelledError:
+            # stop() cancelled the loop mid-write; its final flush sends these ($max makes a repeat harmless)
+            self._requeue(pending)
+            raise
+        except Exception as e:
+            logger.error(f"last_active flush failed: {e}")
+            self._requeue(pending)
+            return
+        self.flushes += 1
+        self.written += len(pending)
+
+    def _requeue(self, pending):
+        for user_id, at in pending.items():
+            self.touch(user_id, at)
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def stats(self):
+        return {"pending": len(self._pending), "interval": self.interval, "flushes": self.flushes, "written": self.written}
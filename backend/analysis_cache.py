@@ -0,0 +1,50 @@
+"""Shared cache of profile analyses, keyed by platform and normalized handle."""
+from datetime import datetime, timedelta
+
+# The parts of a ProfileAnalysis that depend only on (platform, handle)
+ANALYSIS_FIELDS = ("analysis", "recommendations", "best_posting_times", "audience_insights", "content_performance")
+
+
+def normalize_handle(handle):
+    return (handle or "").strip().lstrip("@").lower()
+
+
+class AnalysisCache:
+    """One analysis per ``(platform, handle)`` in ``collection``, reused for ``freshness`` seconds."""
+
+    def __init__(self, collection, freshness=86400.0):
+        self.collection = collection
+        self.freshness = freshness
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, platform, handle):
+        return {"platform": (platform or "").lower(), "handle": normalize_handle(handle)}
+
+    async def get(self, platform, handle):
+        since = datetime.utcnow() - timedelta(seconds=self.freshness)
+        doc = await self.collection.find_one(
+            {**self._key(platform, handle), "created_at": {"$gte": since}},
+            {"_id": 0, **{field: 1 for field in ANALYSIS_FIELDS}}
+        )
+        if doc is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return doc
+
+    async def set(self, platform, handle, analysis):
+        await self.collection.update_one(
+            self._key(platform, handle),
+            {"$set": {**{field: analysis[field] for field in ANALYSIS_FIELDS}, "created_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "freshness": self.freshness,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,85 @@
+"""Server-side aggregation of the admin dashboard counters."""
+import asyncio
+from datetime import datetime, timedelta
+
+from cache import TTLCache
+
+
+def _count(facet):
+    return facet[0]["n"] if facet else 0
+
+
+def _total(facet):
+    return facet[0]["total"] if facet else 0.0
+
+
+class DashboardStats:
+    """Computes the dashboard with one ``$facet`` aggregation per collection.
+
+    Results are cached for ``ttl`` seconds and concurrent cache misses share
+    a single computation, so refresh storms cost one aggregation per window.
+    ``$facet`` sub-pipelines cannot use indexes, so the users and
+    content_ideas aggregations scan their collections; only payments is
+    narrowed by the indexed ``status`` match in front of its facets.
+    """
+
+    def __init__(self, db, ttl=10.0):
+        self.db = db
+        self._cache = TTLCache(maxsize=1, ttl=ttl)
+        self._lock = asyncio.Lock()
+
+    async def get(self):
+        stats = self._cache.get("dashboard")
+        if stats is not None:
+            return stats
+        async with self._lock:
+            stats = self._cache.get("dashboard")
+            if stats is None:
+                stats = await self.compute()
+                self._cache.set("dashboard", stats)
+            return stats
+
+    async def compute(self):
+        now = datetime.utcnow()
+        thirty_days_ago = now - timedelta(days=30)
+        seven_days_ago = now - timedelta(days=7)
+        current_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+        users_pipeline = [{"$facet": {
+            "total": [{"$count": "n"}],
+            "active": [{"$match": {"last_active": {"$gte": thirty_days_ago}}}, {"$count": "n"}],
+            "premium": [{"$match": {"plan": "premium"}}, {"$count": "n"}],
+            "recent": [{"$match": {"created_at": {"$gte": seven_days_ago}}}, {"$count": "n"}],
+        }}]
+        payments_pipeline = [
+            {"$match": {"status": "completed"}},
+            {"$facet": {
+                "total": [{"$group": {"_id": None, "total": {"$sum": "$amount"}}}],
+                "monthly": [
+                    {"$match": {"created_at": {"$gte": current_month}}},
+                    {"$group": {"_id": None, "total": {"$sum": "$amount"}}},
+                ],
+            }},
+        ]
+        ideas_pipeline = [{"$facet": {"total": [{"$count": "n"}]}}]
+
+        users, payments, ideas = await asyncio.gather(
+            self.db.users.aggregate(users_pipeline).to_list(1),
+            self.db.payments.aggregate(payments_pipeline).to_list(1),
+            self.db.content_ideas.aggregate(ideas_pipeline).to_list(1),
+        )
+        users, payments, ideas = users[0], payments[0], ideas[0]
+
+        total_users = _count(users["total"])
+        premium_users = _count(users["premium"])
+        return {
+            "total_users": total_users,
+            "active_users": _count(users["active"]),
+            "premium_users": premium_users,
+            "free_users": total_users - premium_users,
+            "total_revenue": _total(payments["total"]),
+            "monthly_revenue": _total(payments["monthly"]),
+            "recent_signups": _count(users["recent"]),
+            "total_ideas": _count(ideas["total"]),
+            "conversion_rate": round((premium_users / total_users * 100) if total_users > 0 else 0, 2)
+        }
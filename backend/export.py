@@ -0,0 +1,83 @@
+"""Streaming NDJSON/CSV dumps of the main collections.
+
+Rows are read from a Motor cursor and flushed in batches, so memory use
+does not depend on the size of the export.
+"""
+import csv
+import io
+import json
+
+from pymongo import ASCENDING
+
+# collection -> exported fields; payment_data is left out because it holds card data
+EXPORT_FIELDS = {
+    "users": [
+        "id", "email", "name", "plan", "instagram_handle", "tiktok_handle", "kwai_handle",
+        "ideas_generated", "subscription_date", "subscription_expires", "total_paid",
+        "created_at", "last_active", "is_active",
+    ],
+    "payments": ["id", "user_id", "amount", "currency", "payment_method", "status", "created_at"],
+    "content_ideas": ["id", "user_id", "topic", "title", "script", "content_type", "hashtags", "created_at"],
+}
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def _json_default(value):
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def open_cursor(db, collection, start=None, end=None, batch_size=1000):
+    """Cursor over ``collection`` in creation order, optionally limited to ``[start, end)``."""
+    query = {}
+    if start or end:
+        query["created_at"] = {}
+        if start:
+            query["created_at"]["$gte"] = start
+        if end:
+            query["created_at"]["$lt"] = end
+    projection = {"_id": 0, **dict.fromkeys(EXPORT_FIELDS[collection], 1)}
+    return (
+        db[collection]
+        .find(query, projection)
+        .sort([("created_at", ASCENDING), ("id", ASCENDING)])
+        .batch_size(batch_size)
+    )
+
+
+async def stream_ndjson(cursor, fields, batch_size=1000):
+    lines = []
+    async for doc in cursor:
+        row = {field: doc.get(field) for field in fields}
+        lines.append(json.dumps(row, default=_json_default, ensure_ascii=False))
+        if len(lines) >= batch_size:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+
+async def stream_csv(cursor, fields, batch_size=1000):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    rows = 0
+    async for doc in cursor:
+        writer.writerow([_csv_value(doc.get(field)) for field in fields])
+        rows += 1
+        if rows >= batch_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    yield buffer.getvalue().encode()
@@ -0,0 +1,34 @@
+"""Gunicorn settings: one uvicorn worker process per core.
+
+    gunicorn server:app -c gunicorn.conf.py
+
+Each worker opens its own MongoDB client (MONGO_MAX_POOL_SIZE connections
+at most), caches and background tasks in server.py's startup hooks, so
+the app can be imported once by the master and forked (preload_app).
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+# server.py splits the LLM_MAX_CONCURRENCY / LLM_MAX_QUEUE totals between the workers,
+# so there are never more workers than LLM slots (each must get one of its own)
+workers = min(
+    int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count())),
+    int(os.environ.get('LLM_MAX_CONCURRENCY', '8'))
+)
+os.environ['WEB_CONCURRENCY'] = str(workers)
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+# Seconds a worker may stay silent before it is restarted, and that in-flight
+# requests (and the shutdown hooks' final flushes) get on SIGTERM
+timeout = int(os.environ.get('WORKER_TIMEOUT', '120'))
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+
+# Restart each worker after about this many requests (0 = never), jittered so they do not restart together
+max_requests = int(os.environ.get('MAX_REQUESTS', '0'))
+max_requests_jitter = max_requests // 10
+
+accesslog = None
+errorlog = "-"
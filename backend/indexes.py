@@ -0,0 +1,192 @@
+"""Index declarations for every collection queried by server.py.
+
+Run as a script to manage indexes outside the app:
+
+    python indexes.py ensure    # create missing indexes
+    python indexes.py report    # list missing / unused / undeclared indexes
+    python indexes.py explain   # show the winning plan of every hot query
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Every index must back a query in server.py; keep the two in sync.
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Not a covering index: ideas_generated is $inc'ed on every generation and email/plan
+        # would only bloat it, so the admin list summary FETCHes its fields
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+    ],
+    "content_ideas": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Also covers the idea list summary (fields=title,content_type)
+        IndexModel(
+            [("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING),
+             ("title", ASCENDING), ("content_type", ASCENDING)],
+            name="user_id_created_at_id_summary"
+        ),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+    ],
+    "payments": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING)], name="status_created_at"),
+        # Also covers the admin list summary (fields=user_id,amount,payment_method,status)
+        IndexModel(
+            [("created_at", DESCENDING), ("id", DESCENDING), ("user_id", ASCENDING), ("amount", ASCENDING),
+             ("payment_method", ASCENDING), ("status", ASCENDING)],
+            name="created_at_id_summary"
+        ),
+    ],
+    "profile_analyses": [
+        # Also covers the summary (fields=platform,handle)
+        IndexModel(
+            [("user_id", ASCENDING), ("created_at", DESCENDING), ("id", ASCENDING),
+             ("platform", ASCENDING), ("handle", ASCENDING)],
+            name="user_id_created_at_summary"
+        ),
+    ],
+    "analysis_cache": [
+        IndexModel([("platform", ASCENDING), ("handle", ASCENDING)], name="platform_handle_unique", unique=True),
+    ],
+    "analysis_jobs": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created_at"),
+    ],
+    "llm_cache": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "prewarmed_ideas": [
+        IndexModel([("key", ASCENDING), ("consumed", ASCENDING), ("created_at", ASCENDING)], name="key_consumed_created_at"),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "stats_rollups": [
+        IndexModel([("granularity", ASCENDING), ("bucket", ASCENDING)], name="granularity_bucket", unique=True),
+    ],
+}
+
+# (collection, filter, sort[, projection]) of the queries served on every request or dashboard
+# load; those with a projection are sparse-fieldset summaries that must be covered by an index
+HOT_QUERIES = [
+    ("users", {"email": "probe@shadoom.online"}, None),
+    ("users", {"id": "probe"}, None),
+    ("users", {}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("content_ideas", {"id": "probe"}, None),
+    ("content_ideas", {"user_id": "probe"}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("payments", {}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("payments", {"status": "completed"}, [("created_at", DESCENDING)]),
+    ("profile_analyses", {"user_id": "probe"}, [("created_at", DESCENDING)]),
+    ("prewarmed_ideas", {"key": "probe", "consumed": False}, [("created_at", ASCENDING)]),
+    ("analysis_cache", {"platform": "instagram", "handle": "probe"}, None),
+    ("payments", {}, [("created_at", DESCENDING), ("id", DESCENDING)],
+     {"_id": 0, "id": 1, "created_at": 1, "user_id": 1, "amount": 1, "payment_method": 1, "status": 1}),
+    ("content_ideas", {"user_id": "probe"}, [("created_at", DESCENDING), ("id", DESCENDING)],
+     {"_id": 0, "id": 1, "created_at": 1, "title": 1, "content_type": 1}),
+    ("profile_analyses", {"user_id": "probe"}, [("created_at", DESCENDING)],
+     {"_id": 0, "id": 1, "created_at": 1, "platform": 1, "handle": 1}),
+    ("stats_rollups", {"granularity": "day", "bucket": {"$gte": datetime(2000, 1, 1)}}, [("bucket", ASCENDING)]),
+]
+
+
+async def ensure_indexes(db):
+    """Create every declared index; existing identical indexes are left untouched."""
+    for collection, models in INDEXES.items():
+        try:
+            await db[collection].create_indexes(models)
+        except OperationFailure as e:
+            # A duplicate email must not keep the API from starting
+            logger.error(f"Index creation failed on {collection}: {e}")
+
+
+async def report_indexes(db):
+    """Compare declared indexes with the live ones and their usage counters."""
+    report = {}
+    for collection, models in INDEXES.items():
+        declared = {model.document["name"] for model in models}
+        existing = await db[collection].index_information()
+        existing.pop("_id_", None)
+
+        usage = {}
+        try:
+            async for stat in db[collection].aggregate([{"$indexStats": {}}]):
+                usage[stat["name"]] = stat["accesses"]["ops"]
+        except OperationFailure:
+            pass
+
+        report[collection] = {
+            "missing": sorted(declared - set(existing)),
+            "undeclared": sorted(set(existing) - declared),
+            "unused": sorted(name for name, ops in usage.items() if name in existing and ops == 0),
+        }
+    return report
+
+
+def _plan_stages(plan):
+    stages = [plan.get("stage")]
+    if "inputStage" in plan:
+        stages += _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
+
+async def explain_hot_queries(db):
+    """Return the winning plan stages of every hot query, flagging collection scans and uncovered summaries."""
+    plans = []
+    for collection, query, sort, *rest in HOT_QUERIES:
+        projection = rest[0] if rest else None
+        cursor = db[collection].find(query, projection).limit(100)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        stages = _plan_stages(explain["queryPlanner"]["winningPlan"])
+        plans.append({
+            "collection": collection,
+            "filter": json.loads(json.dumps(query, default=str)),
+            "sort": sort,
+            "projection": projection,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+            "covered": projection is not None and "FETCH" not in stages and "COLLSCAN" not in stages,
+        })
+    return plans
+
+
+def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    parser = argparse.ArgumentParser(description="Manage Shadoom MongoDB indexes")
+    parser.add_argument("command", choices=["ensure", "report", "explain"])
+    args = parser.parse_args()
+
+    async def run():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        db = client[os.environ['DB_NAME']]
+        try:
+            if args.command == "ensure":
+                await ensure_indexes(db)
+                return await report_indexes(db)
+            if args.command == "report":
+                return await report_indexes(db)
+            return await explain_hot_queries(db)
+        finally:
+            client.close()
+
+    print(json.dumps(asyncio.run(run()), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
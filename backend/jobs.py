@@ -0,0 +1,127 @@
+"""Mongo-backed background job queue.
+
+Jobs are documents in a collection, so they survive restarts: a worker
+claims a queued job atomically with ``find_one_and_update`` and holds a
+lease on it; jobs whose lease expired (their worker died) are claimed
+again, up to ``max_attempts`` times.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class JobQueue:
+    def __init__(self, collection, handler, concurrency=4, lease=300.0, poll_interval=2.0,
+                 max_attempts=3, retry_on=()):
+        self.collection = collection
+        self.handler = handler
+        self.concurrency = concurrency
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_on = retry_on
+        self._wakeup = asyncio.Event()
+        self._workers = []
+
+    async def submit(self, payload):
+        now = datetime.utcnow()
+        job = {
+            "id": str(uuid.uuid4()),
+            "status": QUEUED,
+            "payload": payload,
+            "attempts": 0,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "available_at": now,
+            "started_at": None,
+            "finished_at": None,
+        }
+        await self.collection.insert_one(job)
+        job.pop("_id", None)
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id):
+        return await self.collection.find_one({"id": job_id}, {"_id": 0})
+
+    async def start(self):
+        # Jobs abandoned by a dead worker after their last attempt will never be claimed again
+        await self.collection.update_many(
+            {"status": RUNNING, "lease_until": {"$lt": datetime.utcnow()}, "attempts": {"$gte": self.max_attempts}},
+            {"$set": {"status": FAILED, "error": "Worker lost", "finished_at": datetime.utcnow()}}
+        )
+        self._workers = [asyncio.ensure_future(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _claim(self):
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": QUEUED, "available_at": {"$lte": now}},
+                    {"status": RUNNING, "lease_until": {"$lt": now}},
+                ],
+                "attempts": {"$lt": self.max_attempts},
+            },
+            {
+                "$set": {"status": RUNNING, "started_at": now, "lease_until": now + timedelta(seconds=self.lease)},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _work(self):
+        while True:
+            # Clear before claiming so a submit racing with an empty claim still wakes us
+            self._wakeup.clear()
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logger.error(f"Job claim failed: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._run(job)
+            except Exception as e:
+                # e.g. the result could not be recorded; the job is re-claimed once its lease expires
+                logger.error(f"Job {job['id']} could not be recorded: {e}")
+
+    async def _run(self, job):
+        try:
+            result = await self.handler(job["payload"])
+            update = {"status": COMPLETED, "result": result, "error": None}
+        except Exception as e:
+            if isinstance(e, self.retry_on) and job["attempts"] < self.max_attempts:
+                # Transient (e.g. LLM overload): back off and let any worker pick it up again
+                update = {
+                    "status": QUEUED,
+                    "error": str(e),
+                    "available_at": datetime.utcnow() + timedelta(seconds=self.poll_interval * job["attempts"]),
+                }
+            else:
+                logger.error(f"Job {job['id']} failed: {e}")
+                update = {"status": FAILED, "error": str(e)}
+        update["finished_at"] = datetime.utcnow() if update["status"] != QUEUED else None
+        await self.collection.update_one({"id": job["id"]}, {"$set": update, "$unset": {"lease_until": ""}})
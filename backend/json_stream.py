@@ -0,0 +1,57 @@
+"""Incremental extraction of JSON objects from a streamed model response."""
+import json
+
+
+class ArrayObjectParser:
+    """Yield every JSON object that is a direct element of an array, as soon as it closes.
+
+    Chunks may split tokens anywhere. Text outside JSON containers (such as a
+    leading ```json fence) is ignored, so for ``{"ideas": [{...}, {...}]}``
+    each idea is returned by the ``feed()`` call that delivers its closing
+    brace. Objects that fail to decode are skipped.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+        self._object_start = None
+
+    def feed(self, chunk):
+        self._buffer += chunk
+        objects = []
+        buffer = self._buffer
+        for i in range(self._pos, len(buffer)):
+            ch = buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                if self._stack:
+                    self._in_string = True
+            elif ch in "{[":
+                if ch == "{" and self._stack and self._stack[-1] == "[" and self._object_start is None:
+                    self._object_start = (i, len(self._stack))
+                self._stack.append(ch)
+            elif ch in "}]" and self._stack:
+                self._stack.pop()
+                if ch == "}" and self._object_start and self._object_start[1] == len(self._stack):
+                    try:
+                        objects.append(json.loads(buffer[self._object_start[0]:i + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                    self._object_start = None
+
+        # Keep only the text an unfinished object may still need
+        keep_from = self._object_start[0] if self._object_start else len(buffer)
+        self._buffer = buffer[keep_from:]
+        self._pos = len(buffer) - keep_from
+        if self._object_start:
+            self._object_start = (0, self._object_start[1])
+        return objects
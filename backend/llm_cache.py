@@ -0,0 +1,115 @@
+"""Cache of parsed LLM idea payloads keyed by normalized topic.
+
+Only the raw idea dicts returned by the model are cached; handlers still
+build fresh ContentIdea records (and ids) for every user they serve.
+"""
+import logging
+import re
+import unicodedata
+from datetime import datetime, timedelta
+
+from cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+STOPWORDS = frozenset("""
+a o as os um uma uns umas de da do das dos em na no nas nos para pra pro por com sem e ou
+sobre como que ao aos à às meu minha seu sua
+the an of for and or to in on at with about how my your
+""".split())
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def normalize_topic(topic):
+    """Lowercase, strip accents and punctuation, drop stopwords and collapse whitespace."""
+    folded = unicodedata.normalize("NFKD", topic.lower())
+    folded = "".join(ch for ch in folded if not unicodedata.combining(ch))
+    words = [word for word in _NON_WORD.sub(" ", folded).split() if word not in STOPWORDS]
+    return " ".join(words) or folded.strip()
+
+
+def ideas_cache_key(topic, plan, handle=None):
+    # The prompt only differs per user when it carries the handle, so the
+    # handle joins the key exactly when the handle context is on.
+    handle_part = f"@{handle.lower()}" if handle else "-"
+    return f"{plan}|{handle_part}|{normalize_topic(topic)}"
+
+
+class MemoryBackend:
+    def __init__(self, maxsize, ttl):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key):
+        return self._cache.get(key)
+
+    async def set(self, key, value):
+        self._cache.set(key, value)
+
+    def size(self):
+        return len(self._cache)
+
+
+class MongoBackend:
+    """Shared backend in the llm_cache collection; expiry is enforced by a TTL index."""
+
+    def __init__(self, collection, ttl):
+        self.collection = collection
+        self.ttl = ttl
+
+    async def get(self, key):
+        doc = await self.collection.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+        return doc["value"] if doc else None
+
+    async def set(self, key, value):
+        await self.collection.update_one(
+            {"_id": key},
+            {"$set": {"value": value, "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl)}},
+            upsert=True
+        )
+
+    def size(self):
+        return None
+
+
+class LlmResponseCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key):
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            logger.error(f"LLM cache read failed: {e}")
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key, value):
+        try:
+            await self.backend.set(key, value)
+        except Exception as e:
+            logger.error(f"LLM cache write failed: {e}")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "size": self.backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def create_cache(db, backend="memory", maxsize=1000, ttl=3600):
+    if backend == "mongo":
+        return LlmResponseCache(MongoBackend(db.llm_cache, ttl))
+    if backend == "memory":
+        return LlmResponseCache(MemoryBackend(maxsize, ttl))
+    raise ValueError(f"Unknown LLM cache backend: {backend}")
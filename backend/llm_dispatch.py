@@ -0,0 +1,141 @@
+"""Admission control for outbound LLM calls.
+
+At most ``max_concurrency`` calls run at once; further callers wait in a
+bounded priority queue (lower number first, FIFO within a priority) and are
+shed immediately once the queue is full, or when their deadline passes.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+PRIORITY_PREMIUM = 0
+PRIORITY_FREE = 1
+PRIORITY_BACKGROUND = 2
+
+
+class LlmUnavailable(Exception):
+    """The call was not (or not fully) served; ``status_code`` is what the API should answer."""
+    status_code = 503
+
+
+class LlmOverloaded(LlmUnavailable):
+    status_code = 429
+
+
+class LlmDeadlineExceeded(LlmUnavailable):
+    status_code = 503
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class LlmDispatcher:
+    def __init__(self, max_concurrency=8, max_queue=64, deadline=30.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self.active = 0
+        self.admitted = 0
+        self.shed = 0
+        self.timed_out = 0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._wait_times = deque(maxlen=1024)
+
+    @property
+    def queue_depth(self):
+        return len(self._waiters)
+
+    def saturated(self):
+        """True when a new caller would be shed right away."""
+        return self.active >= self.max_concurrency and len(self._waiters) >= self.max_queue
+
+    async def _acquire(self, priority, deadline_at):
+        started = time.monotonic()
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+        else:
+            if len(self._waiters) >= self.max_queue:
+                self.shed += 1
+                raise LlmOverloaded("LLM queue is full")
+            fut = asyncio.get_running_loop().create_future()
+            entry = (priority, next(self._seq), fut)
+            heapq.heappush(self._waiters, entry)
+            try:
+                await asyncio.wait_for(fut, max(0.0, deadline_at - time.monotonic()))
+            except BaseException as e:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                if fut.done() and not fut.cancelled():
+                    # The slot was handed over just as we gave up; pass it on
+                    self._release()
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timed_out += 1
+                    raise LlmDeadlineExceeded("Timed out waiting for an LLM slot") from e
+                raise
+        self.admitted += 1
+        self._wait_times.append(time.monotonic() - started)
+
+    def _release(self):
+        # Hand the slot straight to the best waiter so no newcomer can jump the queue
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.active -= 1
+
+    def try_acquire(self):
+        """Take a slot only if one is free right now with nobody queued; pair with ``release()``."""
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+        return False
+
+    def release(self):
+        self._release()
+
+    @asynccontextmanager
+    async def slot(self, priority=PRIORITY_FREE, deadline=None):
+        """Hold one concurrency slot for the body, e.g. while a response streams."""
+        await self._acquire(priority, time.monotonic() + (deadline or self.deadline))
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def submit(self, factory, priority=PRIORITY_FREE, deadline=None):
+        """Run ``factory()`` once a slot is free; the deadline covers queueing and the call."""
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+        await self._acquire(priority, deadline_at)
+        try:
+            return await asyncio.wait_for(factory(), max(0.0, deadline_at - time.monotonic()))
+        except asyncio.TimeoutError as e:
+            self.timed_out += 1
+            raise LlmDeadlineExceeded("LLM call exceeded its deadline") from e
+        finally:
+            self._release()
+
+    def stats(self):
+        waits = list(self._wait_times)
+        return {
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": len(self._waiters),
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "timed_out": self.timed_out,
+            "wait_ms_p50": round(_percentile(waits, 50) * 1000, 2),
+            "wait_ms_p95": round(_percentile(waits, 95) * 1000, 2),
+            "wait_ms_max": round(max(waits, default=0.0) * 1000, 2),
+        }
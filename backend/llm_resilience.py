@@ -0,0 +1,136 @@
+"""Latency-budget controls for LLM calls: hedged requests and a circuit breaker."""
+import asyncio
+import time
+from collections import deque
+
+
+class LlmSkipped(Exception):
+    """No valid model answer within budget; the caller should serve its fallback."""
+
+
+class CircuitBreaker:
+    """Opens when the failure ratio of the last ``window`` calls reaches ``threshold``.
+
+    While open every call is skipped; after ``cooldown`` seconds a single
+    probe call is let through and its outcome closes or re-opens the circuit
+    (a probe that never reports back is replaced after another ``cooldown``).
+    """
+
+    def __init__(self, window=20, min_calls=10, threshold=0.5, cooldown=30.0):
+        self.window = window
+        self.min_calls = min_calls
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = None
+        self._probe_at = None
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        state = self.state
+        if state == "closed":
+            return True
+        now = time.monotonic()
+        if state == "half-open" and (self._probe_at is None or now - self._probe_at >= self.cooldown):
+            self._probe_at = now
+            return True
+        return False
+
+    def record(self, success):
+        if self._probe_at is not None:
+            self._probe_at = None
+            if success:
+                self._opened_at = None
+                self._outcomes.clear()
+            else:
+                self._opened_at = time.monotonic()
+            return
+        self._outcomes.append(success)
+        failures = self._outcomes.count(False)
+        if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.threshold:
+            self._opened_at = time.monotonic()
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "window_calls": len(self._outcomes),
+            "window_failures": self._outcomes.count(False),
+        }
+
+
+async def hedged(factories, validate, hedge_after=0.0, deadline=0.0, breaker=None, retry_failed=False, slots=None):
+    """Return the first valid result from ``factories``, started one after another.
+
+    The first call starts immediately. The next one starts when ``hedge_after``
+    seconds pass without a valid answer (0 disables hedging), or at once if
+    every running call has already failed and hedging or ``retry_failed`` is
+    on; otherwise a failed first call is final. ``validate`` raises for unusable
+    answers. Calls still running when a winner arrives or ``deadline``
+    expires (0 means no deadline) are cancelled; with no winner LlmSkipped
+    is raised.
+
+    The caller's own slot covers one call at a time. With ``slots`` (an
+    LlmDispatcher) a hedge started beside a running call takes a slot of its
+    own, and is put off for another ``hedge_after`` if none is free.
+    """
+    loop = asyncio.get_running_loop()
+    deadline_at = loop.time() + deadline if deadline else None
+    waiting = list(factories)
+    running = set()
+    errors = []
+
+    def launch():
+        extra_slot = slots is not None and bool(running)
+        if extra_slot and not slots.try_acquire():
+            return loop.time() + hedge_after
+        task = asyncio.ensure_future(waiting.pop(0)())
+        if extra_slot:
+            # Also runs when the task is cancelled before it ever started
+            task.add_done_callback(lambda _: slots.release())
+        running.add(task)
+        return loop.time() + hedge_after if hedge_after and waiting else None
+
+    next_hedge_at = launch()
+    try:
+        while running or waiting:
+            if not running:
+                if not (hedge_after or retry_failed):
+                    break
+                next_hedge_at = launch()
+            now = loop.time()
+            timeouts = [t - now for t in (deadline_at, next_hedge_at) if t is not None]
+            if deadline_at is not None and deadline_at <= now:
+                break
+            done, _ = await asyncio.wait(
+                running, timeout=max(0.0, min(timeouts)) if timeouts else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                running.discard(task)
+                try:
+                    result = task.result()
+                    validate(result)
+                except Exception as e:
+                    errors.append(e)
+                    if breaker:
+                        breaker.record(False)
+                    continue
+                if breaker:
+                    breaker.record(True)
+                return result
+            if next_hedge_at is not None and loop.time() >= next_hedge_at:
+                next_hedge_at = launch()
+    finally:
+        for task in running:
+            task.cancel()
+
+    if breaker and not errors:
+        breaker.record(False)
+    raise LlmSkipped(f"No valid LLM answer ({len(errors)} failed, deadline {deadline}s)")
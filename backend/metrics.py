@@ -0,0 +1,231 @@
+"""In-process metrics exposed in the Prometheus text format.
+
+Counters and histograms are plain dicts keyed by label values behind a lock:
+pymongo reports commands from Motor's worker threads, so updates may come
+from outside the event loop.
+"""
+import asyncio
+import bisect
+import threading
+import time
+
+from pymongo import monitoring
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LLM_LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = list(self._values.items())
+        lines += [f"{self.name}{_labels(self.labelnames, labels)} {value}" for labels, value in values]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        names = (*self.labelnames, "le")
+        for labels, counts, total, count in series:
+            cumulative = 0
+            for bound, n in zip((*self.buckets, "+Inf"), counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_labels(names, (*labels, bound))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Gauge:
+    """Value read from ``fn()`` at scrape time."""
+
+    def __init__(self, name, help, fn):
+        self.name = name
+        self.help = help
+        self.fn = fn
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {self.fn()}"]
+
+
+def _with_labels(line, extra):
+    name, sep, rest = line.partition("{")
+    if sep and " " not in name:
+        return f"{name}{{{extra},{rest}"
+    name, _, value = line.partition(" ")
+    return f"{name}{{{extra}}} {value}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        # Constant labels added to every sample, e.g. the worker process id
+        self.labels = {}
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name, help, fn):
+        return self.register(Gauge(name, help, fn))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        if self.labels:
+            extra = _labels(tuple(self.labels), tuple(self.labels.values()))[1:-1]
+            lines = [line if line.startswith("#") else _with_labels(line, extra) for line in lines]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP responses by route template and status.", ("method", "route", "status")
+)
+http_latency = registry.histogram(
+    "http_request_duration_seconds", "Time from request to the end of the response body.", ("method", "route")
+)
+mongo_latency = registry.histogram(
+    "mongo_command_duration_seconds", "MongoDB command round trips.", ("collection", "command")
+)
+mongo_failures = registry.counter(
+    "mongo_command_failures_total", "MongoDB commands that returned an error.", ("collection", "command")
+)
+llm_latency = registry.histogram(
+    "llm_request_duration_seconds", "LLM send_message calls.", ("kind", "outcome"), LLM_LATENCY_BUCKETS
+)
+llm_response_bytes = registry.histogram(
+    "llm_response_bytes", "Size of LLM answers.", ("kind",), SIZE_BUCKETS
+)
+llm_results = registry.counter(
+    "llm_results_total", "Model answers used (parsed) versus replaced by templates (fallback).", ("kind", "result")
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request, streamed bodies included."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            http_latency.observe(time.perf_counter() - started, scope["method"], path)
+            http_requests.inc(scope["method"], path, status)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo listener recording per-collection, per-command durations."""
+
+    def __init__(self):
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        # The collection is the command's first value, except for getMore
+        key = "collection" if event.command_name == "getMore" else event.command_name
+        collection = event.command.get(key)
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = (
+                collection if isinstance(collection, str) else ""
+            )
+
+    def _finish(self, event):
+        with self._lock:
+            collection = self._collections.pop((event.connection_id, event.request_id), "")
+        return collection
+
+    def succeeded(self, event):
+        collection = self._finish(event)
+        mongo_latency.observe(event.duration_micros / 1e6, collection, event.command_name)
+
+    def failed(self, event):
+        collection = self._finish(event)
+        mongo_latency.observe(event.duration_micros / 1e6, collection, event.command_name)
+        mongo_failures.inc(collection, event.command_name)
+
+
+async def timed_llm_call(kind, call):
+    """Await ``call`` (an LlmChat.send_message coroutine), recording latency and answer size."""
+    started = time.perf_counter()
+    try:
+        response = await call
+    except asyncio.CancelledError:
+        # e.g. the losing side of a hedged request
+        llm_latency.observe(time.perf_counter() - started, kind, "cancelled")
+        raise
+    except Exception:
+        llm_latency.observe(time.perf_counter() - started, kind, "error")
+        raise
+    llm_latency.observe(time.perf_counter() - started, kind, "ok")
+    llm_response_bytes.observe(len(response.encode()) if isinstance(response, str) else 0, kind)
+    return response
@@ -0,0 +1,287 @@
+"""Niche detection and precompiled fallback templates.
+
+The niche keywords are compiled once into a single regex, and the fallback
+texts for profile analyses and content ideas are parsed once into
+``Template`` objects, so building a fallback response costs a handful of
+string joins instead of re-evaluating large f-string literals per request.
+"""
+import re
+import unicodedata
+
+DEFAULT_NICHE = "lifestyle"
+
+NICHE_KEYWORDS = {
+    "fitness": [
+        "fit", "fitness", "gym", "treino", "muscle", "healthy", "academia", "workout", "musculacao",
+        "crossfit", "personal trainer", "personaltrainer", "hipertrofia", "emagrecer", "emagrecimento", "corrida", "runner",
+        "running", "yoga", "pilates", "bodybuilding", "maromba", "shape", "saudavel", "nutri",
+    ],
+    "culinária": [
+        "food", "chef", "cook", "recipe", "eat", "receita", "receitas", "cozinha", "culinaria", "comida",
+        "confeitaria", "doces", "bolo", "padaria", "gastronomia", "foodie", "vegano", "vegan",
+        "churrasco", "bake", "baking", "lanche",
+    ],
+    "beleza": [
+        "beauty", "makeup", "skin", "hair", "beleza", "maquiagem", "make", "skincare", "cabelo",
+        "unhas", "nails", "estetica", "cosmetico", "perfume", "glow",
+    ],
+    "moda": [
+        "fashion", "moda", "look", "looks", "style", "estilo", "outfit", "closet", "brecho", "thrift",
+        "streetwear", "modafeminina", "modamasculina",
+    ],
+    "tecnologia": [
+        "tech", "dev", "code", "digital", "tecnologia", "programacao", "programador", "coder",
+        "software", "hacker", "gadget", "gadgets", "android", "iphone", "apple", "linux", "python",
+        "javascript", "inteligenciaartificial", "robot",
+    ],
+    "negócios": [
+        "business", "entrepreneur", "startup", "invest", "negocio", "negocios", "empreendedor",
+        "empreendedorismo", "empresa", "vendas", "marketing", "lider", "ceo", "ecommerce", "loja",
+    ],
+    "finanças": [
+        "financas", "finance", "dinheiro", "money", "investimento", "investimentos", "bolsa", "cripto",
+        "crypto", "bitcoin", "trader", "trade", "economia", "renda", "poupanca",
+    ],
+    "viagem": [
+        "travel", "trip", "adventure", "explore", "viagem", "viagens", "viajar", "mochileiro",
+        "turismo", "nomade", "wanderlust", "praia", "roteiro",
+    ],
+    "maternidade": [
+        "mom", "mama", "baby", "mae", "mamae", "maternidade", "gestante", "gravida", "bebe", "filhos",
+        "maternar",
+    ],
+    "família": ["family", "familia", "pai", "papai", "dad", "casal", "couple", "kids"],
+    "pets": ["pet", "pets", "dog", "dogs", "cachorro", "gato", "gatos", "cat", "cats", "puppy", "vet"],
+    "educação": [
+        "edu", "educacao", "professor", "professora", "teacher", "escola", "estudo", "estudos",
+        "study", "enem", "concurso", "vestibular", "ingles", "english", "idiomas",
+    ],
+    "arte": [
+        "art", "draw", "paint", "creative", "arte", "artista", "artist", "desenho", "pintura",
+        "ilustra", "illustration", "tattoo", "tatuagem", "craft", "artesanato",
+    ],
+    "design": ["design", "designer", "decor", "decoracao", "interiores", "arquitetura", "architecture", "ux"],
+    "fotografia": ["foto", "photo", "photography", "fotografia", "fotografo", "camera", "filmmaker"],
+    "música": [
+        "music", "sing", "guitar", "piano", "musica", "cantor", "cantora", "violao", "funk", "sertanejo",
+        "rap", "trap", "beat", "dj", "band", "banda", "produtor",
+    ],
+    "games": [
+        "game", "gamer", "stream", "play", "games", "gaming", "twitch", "esports", "minecraft", "fortnite",
+        "freefire", "valorant", "console", "xbox", "playstation", "nintendo",
+    ],
+    "esportes": ["futebol", "soccer", "football", "esporte", "esportes", "surf", "skate", "bike", "ciclismo", "nba"],
+    "humor": ["humor", "comedia", "comedy", "meme", "memes", "piada", "zoeira", "funny"],
+}
+
+_KEYWORD_NICHE = {keyword: niche for niche, keywords in NICHE_KEYWORDS.items() for keyword in keywords}
+
+def _keyword_pattern(whole_words):
+    # Longest keywords first so the alternation prefers the most specific match at
+    # each position; the lookahead reports overlapping matches at every offset.
+    # Whole-word keywords may take a plural "s".
+    alternatives = [
+        rf"\b{re.escape(k)}(?=s?\b)" if whole_words else re.escape(k)
+        for k in sorted(_KEYWORD_NICHE, key=len, reverse=True)
+    ]
+    return re.compile("(?=(" + "|".join(alternatives) + "))")
+
+
+_WORD_PATTERN = _keyword_pattern(whole_words=True)
+# Handles run words together ("fitjoe", "devmaria"), so there keywords match anywhere
+_HANDLE_PATTERN = _keyword_pattern(whole_words=False)
+
+
+def fold(text):
+    """Lowercase and strip accents so keywords match regardless of spelling."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def detect_niche(text, default=DEFAULT_NICHE, handle=False):
+    """Return the niche of the longest keyword found in ``text`` (earliest wins ties).
+
+    Keywords match whole words, except in a ``handle``, where they also
+    match inside words.
+    """
+    pattern = _HANDLE_PATTERN if handle else _WORD_PATTERN
+    # "fit_joe" and "fit.joe" are the words "fit" and "joe"
+    words = re.sub(r"[^a-z]+", " ", fold(text or ""))
+    best = ""
+    for match in pattern.finditer(words):
+        if len(match.group(1)) > len(best):
+            best = match.group(1)
+    return _KEYWORD_NICHE[best] if best else default
+
+
+class Template:
+    """A string with ``{name}`` placeholders, split once into literal and field parts."""
+
+    _FIELD = re.compile(r"\{(\w+)\}")
+
+    def __init__(self, text):
+        self.parts = self._FIELD.split(text)
+
+    def render(self, **values):
+        parts = self.parts[:]
+        for i in range(1, len(parts), 2):
+            parts[i] = values[parts[i]]
+        return "".join(parts)
+
+
+def _compile(value):
+    if isinstance(value, str):
+        return Template(value)
+    if isinstance(value, list):
+        return [_compile(item) for item in value]
+    return {key: _compile(item) for key, item in value.items()}
+
+
+def _render(value, **values):
+    if isinstance(value, Template):
+        return value.render(**values)
+    if isinstance(value, list):
+        return [_render(item, **values) for item in value]
+    return {key: _render(item, **values) for key, item in value.items()}
+
+
+PLATFORM_TEMPLATES = {
+    "instagram": {
+        "analysis": "Perfil @{handle} no Instagram: Baseado na análise do handle, identifiquei um foco em {niche}. Instagram é ideal para conteúdo visual de alta qualidade neste nicho. Recomendo estratégia focada em posts carrossel, Stories interativos e Reels com tendências atuais.",
+        "recommendations": [
+            "Crie conteúdo visual atrativo sobre {niche} com iluminação profissional",
+            "Use Stories diários mostrando bastidores do seu trabalho com {niche}",
+            "Faça Reels curtos (15-30s) com dicas práticas de {niche}",
+            "Responda TODOS os comentários nas primeiras 2 horas após publicar",
+            "Use hashtags mix: 3 grandes (1M+), 5 médias (100K-1M), 7 pequenas (1K-100K)",
+            "Publique consistentemente: 3-4 posts por semana + Stories diários"
+        ],
+        "times": ["08:00", "12:30", "19:00"],
+        "audience": "Audiência de @{handle}: Perfil focado em {niche} atrai principalmente pessoas interessadas neste tema. No Instagram, seu público provavelmente é 60% feminino, 25-35 anos, ativo entre 8-10h, 12-14h e 19-21h. Engajamento maior em conteúdo educativo e inspiracional.",
+        "performance": "Para @{handle} no Instagram: Posts em carrossel têm 40% mais engajamento que fotos únicas. Reels sobre {niche} podem ter 3x mais alcance. Stories com enquetes/perguntas aumentam engajamento em 25%. Call-to-actions claros aumentam conversão em 30%."
+    },
+    "tiktok": {
+        "analysis": "Perfil @{handle} no TikTok: Com foco em {niche}, você tem grande potencial viral nesta plataforma. TikTok favorece conteúdo autêntico, educativo e divertido. Estratégia deve focar em trends, sounds populares e hooks fortes nos primeiros 3 segundos.",
+        "recommendations": [
+            "Crie vídeos de 15-30s com dicas rápidas sobre {niche}",
+            "Use músicas/sounds em alta (verifica Discover Weekly)",
+            "Hook forte: '3 segredos sobre {niche} que mudaram minha vida'",
+            "Participe de challenges relacionados ao seu nicho {niche}",
+            "Publique 1-2 vídeos por dia em horários de pico",
+            "Interaja com outros criadores de {niche} através de duetos/stitches"
+        ],
+        "times": ["18:00", "19:30", "21:00"],
+        "audience": "@{handle} no TikTok: Audiência de {niche} é predominantemente jovem (16-28 anos), ativa à noite (18-23h). Attention span de 8 segundos. Prefere conteúdo autêntico, educativo rápido e entretenimento. 45% descobre via FYP, 30% via hashtags.",
+        "performance": "TikTok @{handle}: Vídeos sobre {niche} com texto na tela têm 60% mais views. Trends musicais aumentam alcance em 85%. Conteúdo educativo de 15-30s tem 40% mais saves. Hooks nos primeiros 3s aumentam retenção em 70%."
+    },
+    "kwai": {
+        "analysis": "Perfil @{handle} no Kwai: Plataforma brasileira perfeita para conteúdo de {niche} com toque nacional. Kwai valoriza autenticidade, humor brasileiro e conexão com comunidade local. Ideal para mostrar seu conhecimento em {niche} de forma descontraída.",
+        "recommendations": [
+            "Crie conteúdo sobre {niche} com jeito brasileiro/regional",
+            "Use músicas populares no Brasil (sertanejo, funk, MPB)",
+            "Faça vídeos de 30-60s com humor e informação sobre {niche}",
+            "Interaja muito com comentários - audiência Kwai valoriza proximidade",
+            "Use gírias e expressões regionais ao falar sobre {niche}",
+            "Poste nos horários de pico: noite quando as pessoas relaxam"
+        ],
+        "times": ["19:00", "20:30", "21:30"],
+        "audience": "@{handle} no Kwai: Audiência brasileira interessada em {niche}, mais ativa à noite (19-23h). Valoriza autenticidade e humor. 70% interage mais quando criador responde. Prefere conteúdo descontraído e educativo ao mesmo tempo.",
+        "performance": "Kwai @{handle}: Conteúdo de {niche} com humor brasileiro tem 75% mais engajamento. Vídeos com música nacional performam 65% melhor. Responder comentários aumenta alcance em 45%. CTAs diretos funcionam 35% melhor que indiretos."
+    }
+}
+
+IDEA_TEMPLATES = {
+    "fitness": [
+        {
+            "title": "🔥 Transformei meu corpo em 90 dias com {topic} - RESULTADO CHOCANTE!",
+            "script": "1. 'Há 90 dias eu odiava me olhar no espelho...'\n2. Como descobri {topic} que mudou TUDO\n3. A rotina simples que me deu resultado (sem dieta maluca)\n4. 'Se você quer o mesmo, salva este post e me segue!'",
+            "content_type": "Reels",
+            "hashtags": ["#fitness", "#transformacao", "#90dias", "#antesedepois", "#motivacao", "#treino", "#resultado", "#corpodossonhos"]
+        },
+        {
+            "title": "⚠️ PARE de fazer {topic} se você não sabe ISSO!",
+            "script": "1. '95% das pessoas fazem {topic} ERRADO'\n2. O erro que te impede de ver resultados\n3. A forma correta (que personal trainer cobra R$ 300)\n4. 'Compartilha para salvar alguém!'",
+            "content_type": "Post",
+            "hashtags": ["#fitness", "#erro", "#dicavaliosa", "#personal", "#treino", "#academia", "#segredo", "#resultado"]
+        },
+        {
+            "title": "💪 {topic}: 5 minutos que valem por 1 hora de academia!",
+            "script": "1. 'Sem tempo para treinar? Este vídeo é para você!'\n2. Exercício 1: O básico que funciona\n3. Exercício 2: O que acelera o metabolismo\n4. 'Faz junto comigo e me marca nos stories!'",
+            "content_type": "Reels",
+            "hashtags": ["#fitness", "#5minutos", "#caseiro", "#pratico", "#rapido", "#funciona", "#treino", "#metabolismo"]
+        },
+        {
+            "title": "✨ ANTES vs DEPOIS: Minha jornada com {topic}",
+            "script": "1. ANTES: Como estava minha situação\n2. Durante: O processo que segui com {topic}\n3. DEPOIS: Onde estou hoje (resultado real)\n4. 'Qual parte da jornada você está?'",
+            "content_type": "Stories",
+            "hashtags": ["#fitness", "#antesedepois", "#jornada", "#processo", "#real", "#inspiracao", "#motivacao", "#transformacao"]
+        },
+        {
+            "title": "🎯 {topic} em 60 segundos - MÉTODO TESTADO!",
+            "script": "1. 'Você tem 1 minuto? Vou te ensinar {topic}'\n2. Passo 1: O básico essencial\n3. Passo 2: O segredo que acelera\n4. 'Funcionou? Conta aqui embaixo!'",
+            "content_type": "Reels",
+            "hashtags": ["#fitness", "#1minuto", "#metodo", "#rapido", "#testado", "#funciona", "#treino", "#dica"]
+        }
+    ],
+    "generic": [
+        {
+            "title": "🔥 {topic}: O que MUDOU minha vida em 30 dias!",
+            "script": "1. 'Há 30 dias eu não sabia nada sobre {topic}...'\n2. A descoberta que virou minha chave\n3. Os resultados que consegui (sem mentira)\n4. 'Se funcionar com você, me marca nos stories!'",
+            "content_type": "Reels",
+            "hashtags": ["#{tag}", "#30dias", "#mudanca", "#resultado", "#funciona", "#viral"]
+        },
+        {
+            "title": "⚠️ TODO mundo faz {topic} ERRADO - eu também fazia!",
+            "script": "1. 'Se você faz {topic} assim, PARE AGORA!'\n2. O erro que TODO mundo comete\n3. A forma certa (que poucos conhecem)\n4. 'Salva este post e me agradece depois!'",
+            "content_type": "Post", 
+            "hashtags": ["#{tag}", "#erro", "#alerta", "#dicavaliosa", "#certo", "#importante"]
+        },
+        {
+            "title": "✨ ANTES vs DEPOIS: Minha jornada com {topic}",
+            "script": "1. ANTES: Como estava minha situação\n2. Durante: O processo que segui com {topic}\n3. DEPOIS: Onde estou hoje (resultado real)\n4. 'Qual parte da jornada você está?'",
+            "content_type": "Stories",
+            "hashtags": ["#{tag}", "#antesedepois", "#jornada", "#processo", "#real", "#inspiracao"]
+        },
+        {
+            "title": "🎯 {topic} em 60 segundos - MÉTODO TESTADO!",
+            "script": "1. 'Você tem 1 minuto? Vou te ensinar {topic}'\n2. Passo 1: O básico essencial\n3. Passo 2: O segredo que acelera\n4. 'Funcionou? Conta aqui embaixo!'",
+            "content_type": "Reels",
+            "hashtags": ["#{tag}", "#1minuto", "#metodo", "#rapido", "#testado", "#funciona"]
+        },
+        {
+            "title": "💡 5 erros em {topic} que te impedem de ter resultado!",
+            "script": "1. Erro 1: O que TODO mundo faz errado\n2. Erro 2: A armadilha que eu caí também\n3. Erro 3: O desperdício de tempo/dinheiro\n4. 'Você comete algum? Me fala nos comentários!'",
+            "content_type": "Post",
+            "hashtags": ["#{tag}", "#5erros", "#evite", "#resultado", "#dica", "#cuidado"]
+        }
+    ],
+}
+
+
+# (platform, niche) -> analysis texts with the niche already filled in; only {handle} is left
+_PLATFORM_TABLE = {
+    (platform, niche): _compile(_render(_compile(texts), handle="{handle}", niche=niche))
+    for platform, texts in PLATFORM_TEMPLATES.items()
+    for niche in [*NICHE_KEYWORDS, DEFAULT_NICHE]
+}
+
+_IDEA_TABLE = {category: _compile(ideas) for category, ideas in IDEA_TEMPLATES.items()}
+
+
+def platform_fallback(platform, handle):
+    """Fallback profile analysis texts for ``handle`` on ``platform`` (Instagram if unknown)."""
+    niche = detect_niche(handle, handle=True)
+    if platform not in PLATFORM_TEMPLATES:
+        platform = "instagram"
+    return _render(_PLATFORM_TABLE[(platform, niche)], handle=handle)
+
+
+def topic_category(topic):
+    niche = detect_niche(topic)
+    return niche if niche in IDEA_TEMPLATES else "generic"
+
+
+def fallback_ideas(topic):
+    """Fallback content ideas for ``topic``, picked by the topic's niche."""
+    tag = topic.lower().replace(' ', '')
+    return _render(_IDEA_TABLE[topic_category(topic)], topic=topic, tag=tag)
@@ -0,0 +1,48 @@
+"""Keyset pagination over ``(created_at, id)``, newest first.
+
+Every page is a bounded index seek from the last row of the previous page,
+so deep pages cost the same as the first one.
+"""
+import base64
+import json
+from datetime import datetime
+
+from pymongo import DESCENDING
+
+SORT = [("created_at", DESCENDING), ("id", DESCENDING)]
+
+
+def encode_cursor(doc):
+    raw = json.dumps([doc["created_at"].isoformat(), doc["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return ``(created_at, id)``; raises ValueError for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, doc_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(doc_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def after(query, cursor):
+    """Restrict ``query`` to the rows that sort after ``cursor``."""
+    if not cursor:
+        return query
+    created_at, doc_id = decode_cursor(cursor)
+    return {
+        **query,
+        "created_at": {"$lte": created_at},
+        "$or": [{"created_at": {"$lt": created_at}}, {"id": {"$lt": doc_id}}],
+    }
+
+
+async def fetch_page(collection, query, cursor=None, limit=100, projection=None):
+    """Return ``(docs, next_cursor)``; ``next_cursor`` is None on the last page."""
+    docs = await collection.find(after(query, cursor), projection).sort(SORT).limit(limit + 1).to_list(limit + 1)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        return docs, encode_cursor(docs[-1])
+    return docs, None
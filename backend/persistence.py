@@ -0,0 +1,30 @@
+"""Write paths shared by the idea-generation endpoints."""
+import asyncio
+
+# "batch": one unordered insert_many plus the counter update, sent concurrently.
+# "transaction": the same writes inside a multi-document transaction
+# (requires a replica set or sharded cluster).
+WRITE_MODES = ("batch", "transaction")
+
+
+async def save_generated_ideas(db, user_id, docs, mode="batch", count=True):
+    """Persist generated idea documents and bump the user's ideas_generated counter.
+
+    Pass ``count=False`` when the ideas were already counted by a quota reservation.
+    """
+    if not docs:
+        return
+    counter_update = {"$inc": {"ideas_generated": len(docs)}}
+
+    if mode == "transaction":
+        async with await db.client.start_session() as session:
+            async with session.start_transaction():
+                await db.content_ideas.insert_many(docs, ordered=False, session=session)
+                if count:
+                    await db.users.update_one({"id": user_id}, counter_update, session=session)
+        return
+
+    writes = [db.content_ideas.insert_many(docs, ordered=False)]
+    if count:
+        writes.append(db.users.update_one({"id": user_id}, counter_update))
+    await asyncio.gather(*writes)
@@ -0,0 +1,193 @@
+"""Pool of pre-generated idea sets for the currently trending topics.
+
+A background loop ranks topics by how often ideas were generated for them
+recently, and keeps up to ``sets_per_topic`` fresh, unserved idea sets per
+top topic in the ``prewarmed_ideas`` collection. Requests take a set with an
+atomic ``find_one_and_update`` that marks it consumed, so every set is
+served once; expired sets are dropped by the TTL index on ``expires_at``.
+The ranking is recomputed every ``interval`` seconds, while topics drained
+by requests are topped up as soon as the loop is woken.
+
+With several worker processes, only the holder of the ``prewarm`` lease in
+``leases`` generates sets; the others only keep their ranking current so
+they can serve from the pool. The lease is renewed on every refill and
+taken over once it has not been for ``lease_ttl`` seconds.
+"""
+import asyncio
+import logging
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from llm_cache import normalize_topic
+
+logger = logging.getLogger(__name__)
+
+
+class PrewarmPool:
+    def __init__(self, db, generate, top_n=20, sets_per_topic=2, freshness=21600.0,
+                 interval=600.0, lookback=timedelta(days=7), lease_ttl=None):
+        self.collection = db.prewarmed_ideas
+        self.ideas = db.content_ideas
+        self.leases = db.leases
+        self.owner = uuid.uuid4().hex
+        self.lease_ttl = lease_ttl or 2 * interval
+        self.leader = False
+        self.generate = generate
+        self.top_n = top_n
+        self.sets_per_topic = sets_per_topic
+        self.freshness = freshness
+        self.interval = interval
+        self.lookback = lookback
+        self.topics = {}
+        self.served = 0
+        self.misses = 0
+        self.generated = 0
+        self._drained = set()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def trending_topics(self):
+        """Return ``{normalized topic: most common spelling}`` for the top-N topics."""
+        since = datetime.utcnow() - self.lookback
+        rows = await self.ideas.aggregate([
+            {"$match": {"created_at": {"$gte": since}}},
+            {"$group": {"_id": "$topic", "n": {"$sum": 1}}},
+            {"$sort": {"n": -1}},
+            {"$limit": self.top_n * 5},
+        ]).to_list(None)
+
+        # Spellings that normalize alike count as one topic
+        counts = Counter()
+        spellings = {}
+        for row in rows:
+            if not isinstance(row["_id"], str):
+                continue
+            key = normalize_topic(row["_id"])
+            counts[key] += row["n"]
+            spellings.setdefault(key, row["_id"])
+        return {key: spellings[key] for key, _ in counts.most_common(self.top_n)}
+
+    async def refill(self, keys=None):
+        """Top up ``keys`` (default: re-rank and top up every trending topic)."""
+        if keys is None:
+            self.topics = await self.trending_topics()
+            keys = list(self.topics)
+        now = datetime.utcnow()
+        for key in keys:
+            topic = self.topics.get(key)
+            if topic is None:
+                continue
+            available = await self.collection.count_documents(
+                {"key": key, "consumed": False, "expires_at": {"$gt": now}}
+            )
+            for _ in range(self.sets_per_topic - available):
+                ideas = await self.generate(topic)
+                if not ideas:
+                    break
+                created_at = datetime.utcnow()
+                await self.collection.insert_one({
+                    "id": str(uuid.uuid4()),
+                    "key": key,
+                    "topic": topic,
+                    "ideas": ideas,
+                    "consumed": False,
+                    "created_at": created_at,
+                    "expires_at": created_at + timedelta(seconds=self.freshness),
+                })
+                self.generated += 1
+
+    async def acquire_lease(self):
+        """Take or renew the refill lease; True while this process holds it."""
+        now = datetime.utcnow()
+        try:
+            await self.leases.update_one(
+                {"_id": "prewarm", "$or": [{"owner": self.owner}, {"expires_at": {"$lte": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.lease_ttl)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Held by another process: the filter missed, so the upsert collided on _id
+            self.leader = False
+        else:
+            self.leader = True
+        return self.leader
+
+    async def release_lease(self):
+        if self.leader:
+            self.leader = False
+            await self.leases.delete_one({"_id": "prewarm", "owner": self.owner})
+
+    async def take(self, topic):
+        """Mark one fresh set for ``topic`` consumed and return its ideas, or None."""
+        key = normalize_topic(topic)
+        if key not in self.topics:
+            return None
+        doc = await self.collection.find_one_and_update(
+            {"key": key, "consumed": False, "expires_at": {"$gt": datetime.utcnow()}},
+            {"$set": {"consumed": True, "consumed_at": datetime.utcnow()}},
+            sort=[("created_at", 1)],
+            projection={"_id": 0, "ideas": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if self.leader:
+            # Sets taken in other processes are topped up at the leader's next re-rank
+            self._drained.add(key)
+            self._wakeup.set()
+        if doc is None:
+            self.misses += 1
+            return None
+        self.served += 1
+        return doc["ideas"]
+
+    def start(self):
+        if self.top_n > 0 and self.sets_per_topic > 0:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            try:
+                await self.release_lease()
+            except Exception as e:
+                logger.error(f"Prewarm lease release failed: {e}")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        rerank_at = 0.0
+        while True:
+            # Clear before refilling so a take() during the refill schedules another one
+            self._wakeup.clear()
+            keys, self._drained = self._drained, set()
+            if loop.time() >= rerank_at:
+                keys = None
+                rerank_at = loop.time() + self.interval
+            try:
+                if await self.acquire_lease():
+                    await self.refill(keys)
+                elif keys is None:
+                    self.topics = await self.trending_topics()
+            except Exception as e:
+                logger.error(f"Prewarm refill failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(0.0, rerank_at - loop.time()))
+            except asyncio.TimeoutError:
+                pass
+
+    async def stats(self):
+        available = await self.collection.count_documents(
+            {"consumed": False, "expires_at": {"$gt": datetime.utcnow()}}
+        )
+        return {
+            "topics": list(self.topics.values()),
+            "leader": self.leader,
+            "available_sets": available,
+            "served": self.served,
+            "misses": self.misses,
+            "generated": self.generated,
+        }
@@ -0,0 +1,75 @@
+"""Per-plan usage caps reserved atomically before the work they pay for."""
+from pymongo import ReturnDocument
+
+
+class QuotaExceeded(Exception):
+    """The user does not exist or has no capacity left on their plan."""
+
+
+class Quota:
+    """Caps the numeric user field ``counter`` per plan.
+
+    ``limits`` maps a plan to its cap; plans not listed are unlimited. A
+    reservation succeeds only if the whole amount fits under the cap, and
+    adds it in the same ``find_one_and_update``, so concurrent requests
+    cannot all pass the check before any of them is counted.
+    ``on_change(user_id, delta)`` is told about every counter change.
+    """
+
+    def __init__(self, collection, counter, limits, on_change=None):
+        self.collection = collection
+        self.counter = counter
+        self.limits = limits
+        self.on_change = on_change
+
+    def _filter(self, user_id, amount):
+        capped = [{"plan": plan, self.counter: {"$lte": limit - amount}} for plan, limit in self.limits.items()]
+        return {"id": user_id, "$or": [{"plan": {"$nin": list(self.limits)}}, *capped]}
+
+    async def reserve(self, user_id, amount):
+        user = await self.collection.find_one_and_update(
+            self._filter(user_id, amount),
+            {"$inc": {self.counter: amount}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.BEFORE
+        )
+        if user is None:
+            raise QuotaExceeded(f"No {self.counter} quota left for user {user_id}")
+        user[self.counter] = user.get(self.counter, 0) + amount
+        self._changed(user_id, amount)
+        return Reservation(self, user_id, amount, user)
+
+    async def adjust(self, user_id, delta):
+        if delta:
+            await self.collection.update_one({"id": user_id}, {"$inc": {self.counter: delta}})
+            self._changed(user_id, delta)
+
+    def _changed(self, user_id, delta):
+        if self.on_change:
+            self.on_change(user_id, delta)
+
+
+class Reservation:
+    """Capacity held for one request; settle it with what was used, or release it."""
+
+    def __init__(self, quota, user_id, amount, user):
+        self.quota = quota
+        self.user_id = user_id
+        self.amount = amount
+        self.user = user
+        self.settled = False
+
+    async def settle(self, used):
+        if self.settled:
+            return
+        # Claimed up front so a concurrent settle does not adjust twice, but given
+        # back if the adjustment fails or is cancelled, so a later settle can retry
+        self.settled = True
+        try:
+            await self.quota.adjust(self.user_id, used - self.amount)
+        except BaseException:
+            self.settled = False
+            raise
+
+    async def release(self):
+        await self.settle(0)
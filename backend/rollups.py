@@ -0,0 +1,135 @@
+"""Per-hour and per-day analytics buckets kept in the stats_rollups collection.
+
+Handlers bump the buckets with ``$inc`` upserts as events happen; the
+backfill rebuilds them from the raw collections. Run as a script to
+backfill outside the app:
+
+    python rollups.py backfill
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("hour", "day")
+METRICS = ("signups", "payments", "revenue", "ideas")
+
+# metric -> (collection, match, value expression) used by the backfill
+SOURCES = {
+    "signups": ("users", {}, 1),
+    "payments": ("payments", {"status": "completed"}, 1),
+    "revenue": ("payments", {"status": "completed"}, "$amount"),
+    "ideas": ("content_ideas", {}, 1),
+}
+
+_BUCKET_FORMATS = {"hour": "%Y-%m-%dT%H", "day": "%Y-%m-%d"}
+
+
+def naive_utc(ts):
+    """Stored timestamps are naive UTC; bring aware query parameters in line."""
+    if ts is not None and ts.tzinfo is not None:
+        return ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def bucket_start(ts, granularity):
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+async def record(db, metrics, at=None):
+    """Add ``metrics`` to the hour and day buckets containing ``at``.
+
+    Analytics must never break the request that produced the event, so
+    failures are logged and swallowed.
+    """
+    at = at or datetime.utcnow()
+    operations = [
+        UpdateOne(
+            {"granularity": granularity, "bucket": bucket_start(at, granularity)},
+            {"$inc": metrics},
+            upsert=True
+        )
+        for granularity in GRANULARITIES
+    ]
+    try:
+        await db.stats_rollups.bulk_write(operations, ordered=False)
+    except Exception as e:
+        logger.error(f"Rollup update failed for {metrics}: {e}")
+
+
+async def backfill(db):
+    """Rebuild every bucket from users, payments and content_ideas."""
+    buckets = {}
+    for metric, (collection, match, value) in SOURCES.items():
+        for granularity in GRANULARITIES:
+            pipeline = [
+                {"$match": {**match, "created_at": {"$type": "date"}}},
+                {"$group": {
+                    "_id": {"$dateToString": {"format": _BUCKET_FORMATS[granularity], "date": "$created_at"}},
+                    "value": {"$sum": value},
+                }},
+            ]
+            async for row in db[collection].aggregate(pipeline):
+                bucket = datetime.strptime(row["_id"], _BUCKET_FORMATS[granularity])
+                buckets.setdefault((granularity, bucket), dict.fromkeys(METRICS, 0))[metric] = row["value"]
+
+    # Overwrite in place so live $inc upserts keep landing in the same documents,
+    # then drop buckets left over from earlier rebuilds that no longer have data.
+    rebuilt_at = datetime.utcnow()
+    operations = [
+        UpdateOne(
+            {"granularity": granularity, "bucket": bucket},
+            {"$set": {**metrics, "rebuilt_at": rebuilt_at}},
+            upsert=True
+        )
+        for (granularity, bucket), metrics in buckets.items()
+    ]
+    for i in range(0, len(operations), 1000):
+        await db.stats_rollups.bulk_write(operations[i:i + 1000], ordered=False)
+    await db.stats_rollups.delete_many({"rebuilt_at": {"$lt": rebuilt_at}})
+    return len(buckets)
+
+
+async def query(db, start, end, granularity):
+    """Return the buckets in ``[start, end)``, reading only stats_rollups."""
+    cursor = db.stats_rollups.find(
+        {"granularity": granularity, "bucket": {"$gte": bucket_start(start, granularity), "$lt": end}},
+        {"_id": 0, "bucket": 1, **dict.fromkeys(METRICS, 1)}
+    ).sort("bucket", 1)
+    return [
+        {"bucket": row["bucket"], **{metric: row.get(metric, 0) for metric in METRICS}}
+        async for row in cursor
+    ]
+
+
+def main():
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    parser = argparse.ArgumentParser(description="Manage Shadoom analytics rollups")
+    parser.add_argument("command", choices=["backfill"])
+    parser.parse_args()
+
+    async def run():
+        client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+        try:
+            return await backfill(client[os.environ['DB_NAME']])
+        finally:
+            client.close()
+
+    print(json.dumps({"buckets": asyncio.run(run())}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Fast JSON path for list endpoints: projected Mongo documents encoded by orjson.
+
+Documents written by the current code already carry every response field,
+so they can be encoded as-is; only rows missing a field (written before it
+existed) go through the Pydantic model to get its default.
+
+Endpoints taking ``fields=`` (sparse fieldsets) use ``partial_model`` to
+get a model with just those fields, whose projection can then be answered
+from a covering index alone.
+"""
+from functools import lru_cache
+
+from fastapi.responses import ORJSONResponse
+from pydantic import create_model
+
+# Always returned, since clients key rows on them and cursors are built from them
+KEY_FIELDS = ("id", "created_at")
+
+
+def projection(model):
+    """Mongo projection returning exactly the fields of ``model``."""
+    return {"_id": 0, **{field: 1 for field in model.model_fields}}
+
+
+def conform(docs, model):
+    """Return ``docs`` ready to encode, validating only the incomplete ones."""
+    fields = model.model_fields.keys()
+    return [doc if fields <= doc.keys() else model(**doc).dict() for doc in docs]
+
+
+def partial_model(model, fields=None):
+    """Return ``model`` restricted to the comma-separated ``fields`` plus KEY_FIELDS.
+
+    Raises ValueError naming any field ``model`` does not have.
+    """
+    if not fields:
+        return model
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in model.model_fields]
+    if unknown:
+        raise ValueError(", ".join(unknown))
+    wanted = set(KEY_FIELDS).union(requested)
+    return _partial_model(model, tuple(field for field in model.model_fields if field in wanted))
+
+
+@lru_cache(maxsize=256)
+def _partial_model(model, fields):
+    if set(fields) == set(model.model_fields):
+        return model
+    return create_model(
+        f"{model.__name__}Fields",
+        **{field: (model.model_fields[field].annotation, model.model_fields[field]) for field in fields}
+    )
+
+
+def page_response(docs, model, next_cursor):
+    return ORJSONResponse({"items": conform(docs, model), "next_cursor": next_cursor})
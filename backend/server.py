@@ -1,8 +1,12 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query
 from dotenv import load_dotenv
+from fastapi.responses import StreamingResponse, ORJSONResponse, PlainTextResponse
+from starlette.background import BackgroundTask
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
+import anyio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
@@ -13,23 +17,203 @@ from datetime import datetime, timedelta
 import json
 import re
 
+from indexes import ensure_indexes, report_indexes, explain_hot_queries
+from dashboard import DashboardStats
+import rollups
+import pagination
+import export
+from persistence import save_generated_ideas, WRITE_MODES
+from llm_cache import create_cache, ideas_cache_key, normalize_topic
+from singleflight import SingleFlight
+from json_stream import ArrayObjectParser
+import niches
+from jobs import JobQueue
+from llm_dispatch import (
+    LlmDispatcher, LlmUnavailable, LlmOverloaded, PRIORITY_PREMIUM, PRIORITY_FREE, PRIORITY_BACKGROUND
+)
+from llm_resilience import CircuitBreaker, LlmSkipped, hedged
+from prewarm import PrewarmPool
+from user_cache import UserCache
+from activity import LastActiveBuffer
+from quota import Quota, QuotaExceeded
+from analysis_cache import AnalysisCache, normalize_handle
+import serialization
+import metrics
+import structured_logging
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# JSON logs written by a background thread; LOG_LEVELS sets per-subsystem levels, e.g. "llm=DEBUG,jobs=WARNING"
+log_listener = structured_logging.configure(
+    level=os.environ.get('LOG_LEVEL', 'INFO'),
+    levels=structured_logging.parse_levels(os.environ.get('LOG_LEVELS', ''))
+)
+logger = logging.getLogger(__name__)
+llm_logger = logging.getLogger("llm")
+
+# Share of LLM answers written to the log, each cut to LOG_PAYLOAD_MAX_CHARS characters
+llm_payloads = structured_logging.PayloadSampler(
+    rate=float(os.environ.get('LOG_PAYLOAD_SAMPLE_RATE', '0.01')),
+    max_chars=int(os.environ.get('LOG_PAYLOAD_MAX_CHARS', '2000'))
+)
+
+# MongoDB connection, opened by each worker process at startup (open_database) and never at
+# import, so forked workers do not share a client; pool sizes are per worker
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+DB_NAME = os.environ['DB_NAME']
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '50'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '0'))
+# Seconds the startup warm-up ping and /api/ready wait for MongoDB
+MONGO_PING_TIMEOUT = float(os.environ.get('MONGO_PING_TIMEOUT', '10'))
+client = None
+db = None
 
 # Gemini API key
 GEMINI_API_KEY = os.environ['GEMINI_API_KEY']
 
+# Seconds an admin dashboard snapshot is reused before it is recomputed
+DASHBOARD_CACHE_TTL = float(os.environ.get('DASHBOARD_CACHE_TTL', '10'))
+
+# Upper bound on buckets returned by one /admin/analytics call
+ANALYTICS_MAX_BUCKETS = 24 * 366
+
+# Largest page the cursor-paginated list endpoints will return
+PAGE_MAX_LIMIT = 500
+
+# Rows fetched per Mongo batch and flushed per chunk by the admin exports
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+
+# How generated ideas are persisted: "batch" (default) or "transaction" (replica sets only)
+IDEAS_WRITE_MODE = os.environ.get('IDEAS_WRITE_MODE', 'batch')
+if IDEAS_WRITE_MODE not in WRITE_MODES:
+    raise RuntimeError(f"IDEAS_WRITE_MODE must be one of {WRITE_MODES}")
+
+# Shared cache of parsed idea payloads: "memory" (per process) or "mongo" (shared)
+LLM_CACHE_BACKEND = os.environ.get('LLM_CACHE_BACKEND', 'memory')
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', '1000'))
+LLM_CACHE_TTL = float(os.environ.get('LLM_CACHE_TTL', '3600'))
+
+# Coalesces concurrent identical LLM requests into a single call
+llm_flights = SingleFlight()
+
+# Worker processes serving the app (exported by gunicorn.conf.py)
+WEB_CONCURRENCY = max(1, int(os.environ.get('WEB_CONCURRENCY', '1')))
+
+# Outbound LLM admission control: concurrent calls, queued callers, per-request deadline (s);
+# LLM_MAX_CONCURRENCY and LLM_MAX_QUEUE are totals, split evenly between the worker processes
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', '8'))
+if LLM_MAX_CONCURRENCY < WEB_CONCURRENCY:
+    raise RuntimeError(
+        f"LLM_MAX_CONCURRENCY ({LLM_MAX_CONCURRENCY}) must be at least WEB_CONCURRENCY ({WEB_CONCURRENCY}), "
+        "or the workers together would exceed it"
+    )
+llm_dispatcher = LlmDispatcher(
+    max_concurrency=LLM_MAX_CONCURRENCY // WEB_CONCURRENCY,
+    max_queue=max(1, int(os.environ.get('LLM_MAX_QUEUE', '64')) // WEB_CONCURRENCY),
+    deadline=float(os.environ.get('LLM_DEADLINE', '30'))
+)
+LLM_RETRY_AFTER = 5
+
+# Latency budget per answer: after LLM_HEDGE_AFTER seconds (0 = never) a hedged duplicate
+# goes to LLM_HEDGE_MODEL ("provider/model", default the same model) in a dispatcher slot of
+# its own, put off while none is free; once LLM_HARD_DEADLINE passes without a valid answer
+# the template fallback is served instead
+LLM_MODEL = ("gemini", "gemini-2.0-flash")
+LLM_HEDGE_MODEL = tuple(os.environ.get('LLM_HEDGE_MODEL', '/'.join(LLM_MODEL)).split('/', 1))
+LLM_HEDGE_AFTER = float(os.environ.get('LLM_HEDGE_AFTER', '0'))
+LLM_HARD_DEADLINE = float(os.environ.get('LLM_HARD_DEADLINE', '20'))
+# With hedging off, a failed or malformed answer is retried once on LLM_HEDGE_MODEL only if this is "1"
+LLM_RETRY_ON_FAILURE = os.environ.get('LLM_RETRY_ON_FAILURE', '0') == '1'
+
+# Output token cap per Gemini answer; /generate-ideas/batch packs as many topics into
+# one call as fit at about IDEA_TOKENS_PER_TOPIC tokens for each topic's 5 ideas
+LLM_MAX_TOKENS = 4000
+IDEA_TOKENS_PER_TOPIC = int(os.environ.get('IDEA_TOKENS_PER_TOPIC', '700'))
+IDEAS_BATCH_TOPICS_PER_CALL = max(1, LLM_MAX_TOKENS // IDEA_TOKENS_PER_TOPIC)
+IDEAS_BATCH_MAX_TOPICS = 30
+
+# Skips Gemini and serves templates while too many recent calls fail or time out
+llm_breaker = CircuitBreaker(
+    window=int(os.environ.get('LLM_BREAKER_WINDOW', '20')),
+    threshold=float(os.environ.get('LLM_BREAKER_THRESHOLD', '0.5')),
+    cooldown=float(os.environ.get('LLM_BREAKER_COOLDOWN', '30'))
+)
+
+# Pool of pre-generated idea sets for the PREWARM_TOP_TOPICS most requested topics (0 = off),
+# each set served once within PREWARM_FRESHNESS seconds; the ranking is refreshed every PREWARM_INTERVAL
+PREWARM_TOP_TOPICS = int(os.environ.get('PREWARM_TOP_TOPICS', '20'))
+PREWARM_SETS_PER_TOPIC = int(os.environ.get('PREWARM_SETS_PER_TOPIC', '2'))
+PREWARM_FRESHNESS = float(os.environ.get('PREWARM_FRESHNESS', '21600'))
+PREWARM_INTERVAL = float(os.environ.get('PREWARM_INTERVAL', '600'))
+
+# Profile analyses shared across users for ANALYSIS_CACHE_FRESHNESS seconds per (platform, handle)
+ANALYSIS_CACHE_FRESHNESS = float(os.environ.get('ANALYSIS_CACHE_FRESHNESS', '86400'))
+
+# Background workers for /analyze-profile/jobs in each worker process (their LLM calls still
+# share that process's dispatcher slots); the handler is bound at startup
+ANALYSIS_JOB_WORKERS = int(os.environ.get('ANALYSIS_JOB_WORKERS', '4'))
+
+# User documents cached per process; writes update the cache, so TTL only bounds cross-process staleness
+USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', '10000'))
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', '30'))
+
+# last_active touches are buffered and written in one bulk_write every LAST_ACTIVE_FLUSH_INTERVAL seconds
+LAST_ACTIVE_FLUSH_INTERVAL = float(os.environ.get('LAST_ACTIVE_FLUSH_INTERVAL', '30'))
+
+# Ideas each request reserves against the plan caps on ideas_generated (plans not listed are unlimited)
+IDEAS_PER_REQUEST = 5
+IDEAS_PLAN_LIMITS = {"free": 10}
+
+def open_database():
+    """Create this process's Motor client and the caches and services bound to it.
+
+    Runs in the startup hook, so nothing here exists before a process
+    manager forks its workers.
+    """
+    global client, db, dashboard_stats, ideas_cache, analysis_cache, user_cache, last_active_buffer, ideas_quota
+    global analysis_jobs, prewarmed_ideas
+    client = AsyncIOMotorClient(
+        mongo_url,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        event_listeners=[metrics.MongoCommandMetrics()]
+    )
+    db = client[DB_NAME]
+    dashboard_stats = DashboardStats(db, ttl=DASHBOARD_CACHE_TTL)
+    ideas_cache = create_cache(db, backend=LLM_CACHE_BACKEND, maxsize=LLM_CACHE_MAX_ENTRIES, ttl=LLM_CACHE_TTL)
+    analysis_cache = AnalysisCache(db.analysis_cache, freshness=ANALYSIS_CACHE_FRESHNESS)
+    user_cache = UserCache(db.users, maxsize=USER_CACHE_MAX_ENTRIES, ttl=USER_CACHE_TTL)
+    last_active_buffer = LastActiveBuffer(db.users, interval=LAST_ACTIVE_FLUSH_INTERVAL)
+    ideas_quota = Quota(
+        db.users,
+        "ideas_generated",
+        IDEAS_PLAN_LIMITS,
+        on_change=lambda user_id, delta: user_cache.apply(user_id, inc_fields={"ideas_generated": delta})
+    )
+    analysis_jobs = JobQueue(
+        db.analysis_jobs,
+        process_analysis_job,
+        concurrency=ANALYSIS_JOB_WORKERS,
+        retry_on=(LlmUnavailable,)
+    )
+    prewarmed_ideas = PrewarmPool(
+        db,
+        prewarm_ideas,
+        top_n=PREWARM_TOP_TOPICS,
+        sets_per_topic=PREWARM_SETS_PER_TOPIC,
+        freshness=PREWARM_FRESHNESS,
+        interval=PREWARM_INTERVAL
+    )
+
 # Admin credentials
 ADMIN_EMAIL = "admin@shadoom.online"
 ADMIN_PASSWORD = "@Enigmaext4@"
 
 # Create the main app without a prefix
 app = FastAPI()
+# False until every startup hook has run, and again from the start of shutdown
+app.state.ready = False
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -45,10 +229,22 @@ class ContentIdea(BaseModel):
     hashtags: List[str]
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class ContentIdeaPage(BaseModel):
+    items: List[ContentIdea]
+    next_cursor: Optional[str] = None
+
 class ContentIdeaCreate(BaseModel):
     user_id: str
     topic: str
 
+class ContentIdeaBatchCreate(BaseModel):
+    user_id: str
+    topics: List[str] = Field(min_length=1, max_length=IDEAS_BATCH_MAX_TOPICS)
+
+class TopicIdeas(BaseModel):
+    topic: str
+    ideas: List[ContentIdea]
+
 class User(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     email: str
@@ -127,52 +323,9 @@ async def admin_login(credentials: AdminLogin):
 @api_router.get("/admin/dashboard")
 async def admin_dashboard():
     try:
-        # Total users
-        total_users = await db.users.count_documents({})
-        
-        # Active users (logged in last 30 days)
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        active_users = await db.users.count_documents({
-            "last_active": {"$gte": thirty_days_ago}
-        })
-        
-        # Premium users
-        premium_users = await db.users.count_documents({"plan": "premium"})
-        
-        # Total revenue
-        payments = await db.payments.find({"status": "completed"}).to_list(1000)
-        total_revenue = sum(payment["amount"] for payment in payments)
-        
-        # Recent signups (last 7 days)
-        seven_days_ago = datetime.utcnow() - timedelta(days=7)
-        recent_signups = await db.users.count_documents({
-            "created_at": {"$gte": seven_days_ago}
-        })
-        
-        # Total ideas generated
-        total_ideas = await db.content_ideas.count_documents({})
-        
-        # Monthly revenue
-        current_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        monthly_payments = await db.payments.find({
-            "status": "completed",
-            "created_at": {"$gte": current_month}
-        }).to_list(100)
-        monthly_revenue = sum(payment["amount"] for payment in monthly_payments)
-        
-        return {
-            "total_users": total_users,
-            "active_users": active_users,
-            "premium_users": premium_users,
-            "free_users": total_users - premium_users,
-            "total_revenue": total_revenue,
-            "monthly_revenue": monthly_revenue,
-            "recent_signups": recent_signups,
-            "total_ideas": total_ideas,
-            "conversion_rate": round((premium_users / total_users * 100) if total_users > 0 else 0, 2)
-        }
+        return await dashboard_stats.get()
     except Exception as e:
-        print(f"Dashboard error: {e}")
+        logger.error(f"Dashboard error: {e}")
         return {
             "total_users": 0,
             "active_users": 0,
@@ -185,23 +338,118 @@ async def admin_dashboard():
             "conversion_rate": 0.0
         }
 
-@api_router.get("/admin/users")
-async def admin_get_users():
-    users = await db.users.find().sort("created_at", -1).to_list(100)
-    return [User(**user) for user in users]
+@api_router.get("/admin/indexes")
+async def admin_indexes():
+    return {
+        "indexes": await report_indexes(db),
+        "plans": await explain_hot_queries(db)
+    }
+
+@api_router.get("/admin/analytics")
+async def admin_analytics(
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    granularity: str = "day"
+):
+    if granularity not in rollups.GRANULARITIES:
+        raise HTTPException(status_code=400, detail="granularity must be 'hour' or 'day'")
+    
+    end = rollups.naive_utc(end) or datetime.utcnow()
+    start = rollups.naive_utc(start) or end - timedelta(days=30)
+    bucket_size = timedelta(hours=1) if granularity == "hour" else timedelta(days=1)
+    if start >= end or (end - start) / bucket_size > ANALYTICS_MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail="Invalid or too large date range")
+    
+    return {
+        "granularity": granularity,
+        "from": start,
+        "to": end,
+        "buckets": await rollups.query(db, start, end, granularity)
+    }
+
+@api_router.post("/admin/analytics/backfill")
+async def admin_analytics_backfill():
+    buckets = await rollups.backfill(db)
+    return {"message": "Analytics rebuilt", "buckets": buckets}
+
+def select_fields(model, fields: Optional[str]):
+    # Sparse fieldset: the model (and so the Mongo projection) narrowed to ``fields``
+    try:
+        return serialization.partial_model(model, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Campos inválidos: {e}")
+
+async def fetch_page(collection, query, cursor, limit, model=None):
+    # With a model, only its fields are loaded (see serialization.page_response)
+    try:
+        return await pagination.fetch_page(
+            collection, query, cursor, limit, serialization.projection(model) if model else None
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+@api_router.get("/admin/export/{collection}")
+async def admin_export(
+    collection: str,
+    export_format: str = Query("ndjson", alias="format"),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to")
+):
+    if collection not in export.EXPORT_FIELDS:
+        raise HTTPException(status_code=404, detail="Unknown collection")
+    if export_format not in export.MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'csv'")
+    
+    fields = export.EXPORT_FIELDS[collection]
+    cursor = export.open_cursor(
+        db, collection, rollups.naive_utc(start), rollups.naive_utc(end), EXPORT_BATCH_SIZE
+    )
+    stream = export.stream_csv if export_format == "csv" else export.stream_ndjson
+    return StreamingResponse(
+        stream(cursor, fields, EXPORT_BATCH_SIZE),
+        media_type=export.MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{collection}.{export_format}"'}
+    )
+
+@api_router.get("/admin/llm-cache")
+async def admin_llm_cache():
+    return {**ideas_cache.stats(), "single_flight": llm_flights.stats()}
+
+@api_router.get("/admin/llm-queue")
+async def admin_llm_queue():
+    return {**llm_dispatcher.stats(), "circuit": llm_breaker.stats()}
+
+@api_router.get("/admin/analysis-cache")
+async def admin_analysis_cache():
+    return analysis_cache.stats()
+
+@api_router.get("/admin/user-cache")
+async def admin_user_cache():
+    return {**user_cache.stats(), "last_active": last_active_buffer.stats()}
+
+@api_router.get("/admin/prewarm")
+async def admin_prewarm():
+    return await prewarmed_ideas.stats()
+
+@api_router.get("/admin/users", response_class=ORJSONResponse)
+async def admin_get_users(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=PAGE_MAX_LIMIT),
+    fields: Optional[str] = None
+):
+    model = select_fields(User, fields)
+    users, next_cursor = await fetch_page(db.users, {}, cursor, limit, model)
+    return serialization.page_response(users, model, next_cursor)
 
 @api_router.post("/admin/users/{user_id}/upgrade")
 async def admin_upgrade_user(user_id: str):
-    result = await db.users.update_one(
-        {"id": user_id},
-        {
-            "$set": {
-                "plan": "premium",
-                "subscription_date": datetime.utcnow(),
-                "subscription_expires": datetime.utcnow() + timedelta(days=30)
-            }
-        }
-    )
+    upgrade = {
+        "plan": "premium",
+        "subscription_date": datetime.utcnow(),
+        "subscription_expires": datetime.utcnow() + timedelta(days=30)
+    }
+    result = await db.users.update_one({"id": user_id}, {"$set": upgrade})
+    user_cache.apply(user_id, upgrade)
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
@@ -210,54 +458,56 @@ async def admin_upgrade_user(user_id: str):
 
 @api_router.post("/admin/users/{user_id}/downgrade")
 async def admin_downgrade_user(user_id: str):
-    result = await db.users.update_one(
-        {"id": user_id},
-        {
-            "$set": {
-                "plan": "free",
-                "subscription_expires": None
-            }
-        }
-    )
+    downgrade = {
+        "plan": "free",
+        "subscription_expires": None
+    }
+    result = await db.users.update_one({"id": user_id}, {"$set": downgrade})
+    user_cache.apply(user_id, downgrade)
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
     return {"message": "User downgraded to free"}
 
-@api_router.get("/admin/payments")
-async def admin_get_payments():
-    payments = await db.payments.find().sort("created_at", -1).to_list(100)
-    return [PaymentRecord(**payment) for payment in payments]
+@api_router.get("/admin/payments", response_class=ORJSONResponse)
+async def admin_get_payments(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=PAGE_MAX_LIMIT),
+    fields: Optional[str] = None
+):
+    model = select_fields(PaymentRecord, fields)
+    payments, next_cursor = await fetch_page(db.payments, {}, cursor, limit, model)
+    return serialization.page_response(payments, model, next_cursor)
+
+def touch_user(user_id: str):
+    # Update last_active (written by the next buffer flush)
+    now = datetime.utcnow()
+    last_active_buffer.touch(user_id, now)
+    user_cache.apply(user_id, {"last_active": now}, conflicts=False)
 
 @api_router.post("/users", response_model=User)
 async def create_user(user_data: UserCreate):
     # Check if user already exists
-    existing_user = await db.users.find_one({"email": user_data.email})
+    existing_user = await user_cache.get_by_email(user_data.email)
     if existing_user:
-        # Update last_active
-        await db.users.update_one(
-            {"email": user_data.email},
-            {"$set": {"last_active": datetime.utcnow()}}
-        )
+        touch_user(existing_user["id"])
         return User(**existing_user)
     
     user_dict = user_data.dict()
     user_obj = User(**user_dict)
     await db.users.insert_one(user_obj.dict())
+    user_cache.put(user_obj.dict())
+    await rollups.record(db, {"signups": 1}, user_obj.created_at)
     return user_obj
 
 @api_router.get("/users/{email}")
 async def get_user(email: str):
-    user = await db.users.find_one({"email": email})
+    user = await user_cache.get_by_email(email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Update last_active
-    await db.users.update_one(
-        {"email": email},
-        {"$set": {"last_active": datetime.utcnow()}}
-    )
+    touch_user(user["id"])
     
     return User(**user)
 
@@ -265,7 +515,7 @@ async def get_user(email: str):
 async def purchase_premium(request: PurchaseRequest):
     try:
         # Get user
-        user = await db.users.find_one({"id": request.user_id})
+        user = await user_cache.get(request.user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -307,17 +557,17 @@ async def purchase_premium(request: PurchaseRequest):
         if payment_record.status == "completed":
             # Upgrade user to premium
             subscription_expires = datetime.utcnow() + timedelta(days=30)
+            upgrade = {
+                "plan": "premium",
+                "subscription_date": datetime.utcnow(),
+                "subscription_expires": subscription_expires
+            }
             await db.users.update_one(
                 {"id": request.user_id},
-                {
-                    "$set": {
-                        "plan": "premium",
-                        "subscription_date": datetime.utcnow(),
-                        "subscription_expires": subscription_expires
-                    },
-                    "$inc": {"total_paid": amount}
-                }
+                {"$set": upgrade, "$inc": {"total_paid": amount}}
             )
+            user_cache.apply(request.user_id, upgrade, {"total_paid": amount})
+            await rollups.record(db, {"payments": 1, "revenue": amount}, payment_record.created_at)
             
             return {
                 "success": True,
@@ -334,170 +584,131 @@ async def purchase_premium(request: PurchaseRequest):
             }
             
     except Exception as e:
-        print(f"Payment error: {e}")
+        logger.error(f"Payment error: {e}")
         raise HTTPException(status_code=500, detail="Erro no processamento do pagamento")
 
+def build_ideas_chat(user_id: str, topic: str, handle: Optional[str] = None, model: tuple = LLM_MODEL):
+    """Return the Gemini chat session and prompt used to generate ideas about ``topic``."""
+    # Create AI chat session with improved prompt
+    chat = LlmChat(
+        api_key=GEMINI_API_KEY,
+        session_id=f"ideas_{user_id}_{uuid.uuid4()}",
+        system_message="""Você é um especialista em criação de conteúdo para influenciadores digitais. 
+        
+        IMPORTANTE: Responda SEMPRE no formato JSON válido abaixo. NÃO adicione texto antes ou depois do JSON.
+        
+        Gere 5 ideias criativas e virais para o tópico solicitado. Para cada ideia:
+        - Título: Clickbait atrativo com emojis
+        - Roteiro: 4 pontos práticos e envolventes
+        - Tipo: Reels, Post ou Stories
+        - Hashtags: 6-8 tags populares e relevantes
+        
+        RESPONDA APENAS ESTE JSON:
+        {
+            "ideas": [
+                {
+                    "title": "🔥 Título super atrativo com emoji",
+                    "script": "1. Gancho inicial impactante\n2. Desenvolvimento do tema principal\n3. Valor prático ou insight\n4. Call to action envolvente",
+                    "content_type": "Reels",
+                    "hashtags": ["#tag1", "#tag2", "#tag3", "#tag4", "#tag5", "#tag6"]
+                }
+            ]
+        }
+        """
+    ).with_model(*model).with_max_tokens(LLM_MAX_TOKENS)
+
+    # Generate ideas with context
+    context_message = f"Gere 5 ideias criativas para influenciadores sobre: {topic}. " + \
+                     f"Foque em conteúdo viral, engajamento alto e valor para o público."
+    
+    if handle:
+        context_message += f" O influenciador tem Instagram @{handle}."
+    
+    return chat, UserMessage(text=context_message)
+
+async def request_llm_ideas(user_id: str, topic: str, handle: Optional[str] = None, model: tuple = LLM_MODEL):
+    """Ask Gemini for ideas about ``topic`` and return the raw response text."""
+    chat, user_message = build_ideas_chat(user_id, topic, handle, model)
+    response = await metrics.timed_llm_call("ideas", chat.send_message(user_message))
+    
+    llm_payloads.log(llm_logger, "AI response", response, kind="ideas", user_id=user_id, topic=topic)
+    return response
+
+async def stream_llm_ideas(user_id: str, topic: str, handle: Optional[str] = None):
+    """Yield the Gemini response for ``topic`` chunk by chunk as it is generated."""
+    chat, user_message = build_ideas_chat(user_id, topic, handle)
+    if hasattr(chat, "stream_message"):
+        async for chunk in chat.stream_message(user_message):
+            yield chunk
+    else:
+        # Clients without token streaming deliver the whole answer as one chunk
+        yield await metrics.timed_llm_call("ideas_stream", chat.send_message(user_message))
+
+def content_idea_from(user_id: str, topic: str, idea: dict):
+    return ContentIdea(
+        user_id=user_id,
+        topic=topic,
+        title=idea.get("title", f"💡 Ideia sobre {topic}"),
+        script=idea.get("script", "Roteiro criativo em desenvolvimento..."),
+        content_type=idea.get("content_type", "Reels"),
+        hashtags=idea.get("hashtags", [f"#{topic.lower().replace(' ', '')}"])
+    )
+
 @api_router.post("/generate-ideas", response_model=List[ContentIdea])
 async def generate_content_ideas(request: ContentIdeaCreate):
+    reservation = None
     try:
         # Get user to check plan and limits
-        user = await db.users.find_one({"id": request.user_id})
+        user = await user_cache.get(request.user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        user_obj = User(**user)
+        # Reserve quota before spending LLM tokens; settled or released below
+        reservation = await reserve_ideas(request.user_id, IDEAS_PER_REQUEST)
+        user_obj = User(**reservation.user)
         
-        # Check limits for free users
-        if user_obj.plan == "free" and user_obj.ideas_generated >= 10:
-            raise HTTPException(
-                status_code=403, 
-                detail="Limite de ideias atingido. Faça upgrade para Premium para ideias ilimitadas!"
-            )
         
-        # Create AI chat session with improved prompt
-        chat = LlmChat(
-            api_key=GEMINI_API_KEY,
-            session_id=f"ideas_{request.user_id}_{uuid.uuid4()}",
-            system_message="""Você é um especialista em criação de conteúdo para influenciadores digitais. 
-            
-            IMPORTANTE: Responda SEMPRE no formato JSON válido abaixo. NÃO adicione texto antes ou depois do JSON.
-            
-            Gere 5 ideias criativas e virais para o tópico solicitado. Para cada ideia:
-            - Título: Clickbait atrativo com emojis
-            - Roteiro: 4 pontos práticos e envolventes
-            - Tipo: Reels, Post ou Stories
-            - Hashtags: 6-8 tags populares e relevantes
-            
-            RESPONDA APENAS ESTE JSON:
-            {
-                "ideas": [
-                    {
-                        "title": "🔥 Título super atrativo com emoji",
-                        "script": "1. Gancho inicial impactante\n2. Desenvolvimento do tema principal\n3. Valor prático ou insight\n4. Call to action envolvente",
-                        "content_type": "Reels",
-                        "hashtags": ["#tag1", "#tag2", "#tag3", "#tag4", "#tag5", "#tag6"]
-                    }
-                ]
-            }
-            """
-        ).with_model("gemini", "gemini-2.0-flash").with_max_tokens(4000)
-
-        # Generate ideas with context
-        context_message = f"Gere 5 ideias criativas para influenciadores sobre: {request.topic}. " + \
-                         f"Foque em conteúdo viral, engajamento alto e valor para o público."
-        
-        if user_obj.plan == "premium" and user_obj.instagram_handle:
-            context_message += f" O influenciador tem Instagram @{user_obj.instagram_handle}."
-        
-        user_message = UserMessage(text=context_message)
-        response = await chat.send_message(user_message)
-        
-        print(f"AI Response: {response}")  # Debug log
+        # Serve a pre-generated set for trending topics, else reuse a recent
+        # model answer for the same normalized topic when there is one
+        handle = user_obj.instagram_handle if user_obj.plan == "premium" else None
+        cache_key = ideas_cache_key(request.topic, user_obj.plan, handle)
+        cached_ideas = await prewarmed_ideas.take(request.topic) if handle is None else None
+        if cached_ideas is None:
+            cached_ideas = await ideas_cache.get(cache_key)
+        if cached_ideas is None:
+            response = await call_llm(
+                f"ideas|{cache_key}",
+                [lambda model=model: request_llm_ideas(request.user_id, request.topic, handle, model)
+                 for model in (LLM_MODEL, LLM_HEDGE_MODEL)],
+                validate_ideas_response,
+                priority=llm_priority(user_obj)
+            )
         
         # Try to parse AI response as JSON
         ideas_list = []
         try:
-            # Clean response - remove code blocks if present
-            clean_response = response.strip()
-            if clean_response.startswith('```json'):
-                clean_response = clean_response[7:]
-            if clean_response.endswith('```'):
-                clean_response = clean_response[:-3]
-            clean_response = clean_response.strip()
-            
-            # Parse JSON
-            ideas_data = json.loads(clean_response)
+            if cached_ideas is not None:
+                ideas_data = {"ideas": cached_ideas}
+            elif response is None:
+                raise ValueError("LLM skipped")
+            else:
+                ideas_data = parse_llm_json(response)
             
             if "ideas" in ideas_data and isinstance(ideas_data["ideas"], list):
                 for idea in ideas_data["ideas"]:
-                    content_idea = ContentIdea(
-                        user_id=request.user_id,
-                        topic=request.topic,
-                        title=idea.get("title", f"💡 Ideia sobre {request.topic}"),
-                        script=idea.get("script", "Roteiro criativo em desenvolvimento..."),
-                        content_type=idea.get("content_type", "Reels"),
-                        hashtags=idea.get("hashtags", [f"#{request.topic.lower().replace(' ', '')}"])
-                    )
-                    
-                    # Save to database
-                    await db.content_ideas.insert_one(content_idea.dict())
-                    ideas_list.append(content_idea)
+                    ideas_list.append(content_idea_from(request.user_id, request.topic, idea))
             
             if len(ideas_list) == 0:
                 raise ValueError("No valid ideas generated")
+            
+            if cached_ideas is None:
+                metrics.llm_results.inc("ideas", "parsed")
+                await ideas_cache.set(cache_key, ideas_data["ideas"])
                 
         except (json.JSONDecodeError, ValueError, KeyError) as e:
-            print(f"Failed to parse AI response: {e}")
-            # Enhanced fallback with better ideas
-            topic_lower = request.topic.lower()
-            
-            if "fitness" in topic_lower or "treino" in topic_lower or "academia" in topic_lower:
-                fallback_ideas = [
-                    {
-                        "title": f"🔥 Transformei meu corpo em 90 dias com {request.topic} - RESULTADO CHOCANTE!",
-                        "script": f"1. 'Há 90 dias eu odiava me olhar no espelho...'\n2. Como descobri {request.topic} que mudou TUDO\n3. A rotina simples que me deu resultado (sem dieta maluca)\n4. 'Se você quer o mesmo, salva este post e me segue!'",
-                        "content_type": "Reels",
-                        "hashtags": ["#fitness", "#transformacao", "#90dias", "#antesedepois", "#motivacao", "#treino", "#resultado", "#corpodossonhos"]
-                    },
-                    {
-                        "title": f"⚠️ PARE de fazer {request.topic} se você não sabe ISSO!",
-                        "script": f"1. '95% das pessoas fazem {request.topic} ERRADO'\n2. O erro que te impede de ver resultados\n3. A forma correta (que personal trainer cobra R$ 300)\n4. 'Compartilha para salvar alguém!'",
-                        "content_type": "Post",
-                        "hashtags": ["#fitness", "#erro", "#dicavaliosa", "#personal", "#treino", "#academia", "#segredo", "#resultado"]
-                    },
-                    {
-                        "title": f"💪 {request.topic}: 5 minutos que valem por 1 hora de academia!",
-                        "script": f"1. 'Sem tempo para treinar? Este vídeo é para você!'\n2. Exercício 1: O básico que funciona\n3. Exercício 2: O que acelera o metabolismo\n4. 'Faz junto comigo e me marca nos stories!'",
-                        "content_type": "Reels",
-                        "hashtags": ["#fitness", "#5minutos", "#caseiro", "#pratico", "#rapido", "#funciona", "#treino", "#metabolismo"]
-                    },
-                    {
-                        "title": f"✨ ANTES vs DEPOIS: Minha jornada com {request.topic}",
-                        "script": f"1. ANTES: Como estava minha situação\n2. Durante: O processo que segui com {request.topic}\n3. DEPOIS: Onde estou hoje (resultado real)\n4. 'Qual parte da jornada você está?'",
-                        "content_type": "Stories",
-                        "hashtags": ["#fitness", "#antesedepois", "#jornada", "#processo", "#real", "#inspiracao", "#motivacao", "#transformacao"]
-                    },
-                    {
-                        "title": f"🎯 {request.topic} em 60 segundos - MÉTODO TESTADO!",
-                        "script": f"1. 'Você tem 1 minuto? Vou te ensinar {request.topic}'\n2. Passo 1: O básico essencial\n3. Passo 2: O segredo que acelera\n4. 'Funcionou? Conta aqui embaixo!'",
-                        "content_type": "Reels",
-                        "hashtags": ["#fitness", "#1minuto", "#metodo", "#rapido", "#testado", "#funciona", "#treino", "#dica"]
-                    }
-                ]
-            else:
-                # Generic fallback for any topic
-                fallback_ideas = [
-                    {
-                        "title": f"🔥 {request.topic}: O que MUDOU minha vida em 30 dias!",
-                        "script": f"1. 'Há 30 dias eu não sabia nada sobre {request.topic}...'\n2. A descoberta que virou minha chave\n3. Os resultados que consegui (sem mentira)\n4. 'Se funcionar com você, me marca nos stories!'",
-                        "content_type": "Reels",
-                        "hashtags": [f"#{request.topic.lower().replace(' ', '')}", "#30dias", "#mudanca", "#resultado", "#funciona", "#viral"]
-                    },
-                    {
-                        "title": f"⚠️ TODO mundo faz {request.topic} ERRADO - eu também fazia!",
-                        "script": f"1. 'Se você faz {request.topic} assim, PARE AGORA!'\n2. O erro que TODO mundo comete\n3. A forma certa (que poucos conhecem)\n4. 'Salva este post e me agradece depois!'",
-                        "content_type": "Post", 
-                        "hashtags": [f"#{request.topic.lower().replace(' ', '')}", "#erro", "#alerta", "#dicavaliosa", "#certo", "#importante"]
-                    },
-                    {
-                        "title": f"✨ ANTES vs DEPOIS: Minha jornada com {request.topic}",
-                        "script": f"1. ANTES: Como estava minha situação\n2. Durante: O processo que segui com {request.topic}\n3. DEPOIS: Onde estou hoje (resultado real)\n4. 'Qual parte da jornada você está?'",
-                        "content_type": "Stories",
-                        "hashtags": [f"#{request.topic.lower().replace(' ', '')}", "#antesedepois", "#jornada", "#processo", "#real", "#inspiracao"]
-                    },
-                    {
-                        "title": f"🎯 {request.topic} em 60 segundos - MÉTODO TESTADO!",
-                        "script": f"1. 'Você tem 1 minuto? Vou te ensinar {request.topic}'\n2. Passo 1: O básico essencial\n3. Passo 2: O segredo que acelera\n4. 'Funcionou? Conta aqui embaixo!'",
-                        "content_type": "Reels",
-                        "hashtags": [f"#{request.topic.lower().replace(' ', '')}", "#1minuto", "#metodo", "#rapido", "#testado", "#funciona"]
-                    },
-                    {
-                        "title": f"💡 5 erros em {request.topic} que te impedem de ter resultado!",
-                        "script": f"1. Erro 1: O que TODO mundo faz errado\n2. Erro 2: A armadilha que eu caí também\n3. Erro 3: O desperdício de tempo/dinheiro\n4. 'Você comete algum? Me fala nos comentários!'",
-                        "content_type": "Post",
-                        "hashtags": [f"#{request.topic.lower().replace(' ', '')}", "#5erros", "#evite", "#resultado", "#dica", "#cuidado"]
-                    }
-                ]
+            llm_logger.warning(f"Failed to parse AI response: {e}")
+            metrics.llm_results.inc("ideas", "fallback")
+            fallback_ideas = niches.fallback_ideas(request.topic)
             
             for idea_data in fallback_ideas:
                 content_idea = ContentIdea(
@@ -508,48 +719,354 @@ async def generate_content_ideas(request: ContentIdeaCreate):
                     content_type=idea_data["content_type"],
                     hashtags=idea_data["hashtags"]
                 )
-                
-                # Save to database
-                await db.content_ideas.insert_one(content_idea.dict())
                 ideas_list.append(content_idea)
         
-        # Update user ideas count
-        await db.users.update_one(
-            {"id": request.user_id},
-            {"$inc": {"ideas_generated": len(ideas_list)}}
+        # Save ideas, then settle the reserved count with what was saved
+        await asyncio.gather(
+            save_generated_ideas(db, request.user_id, [idea.dict() for idea in ideas_list], IDEAS_WRITE_MODE, count=False),
+            rollups.record(db, {"ideas": len(ideas_list)})
         )
+        await reservation.settle(len(ideas_list))
         
         return ideas_list
         
     except HTTPException:
         raise
+    except LlmUnavailable as e:
+        raise llm_unavailable_error(e)
     except Exception as e:
-        print(f"Error generating ideas: {e}")
+        logger.exception(f"Error generating ideas: {e}")
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
+    finally:
+        # No-op once settled; gives the capacity back when generation failed
+        if reservation is not None:
+            await reservation.release()
 
-@api_router.post("/analyze-profile", response_model=ProfileAnalysis)
-async def analyze_profile(request: dict):
-    user_id = request.get("user_id")
-    platform = request.get("platform")  # instagram, tiktok, kwai
-    handle = request.get("handle")
-    
-    # Check if user has premium plan
-    user = await db.users.find_one({"id": user_id})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    if user["plan"] != "premium":
+async def reserve_ideas(user_id: str, amount: int):
+    try:
+        return await ideas_quota.reserve(user_id, amount)
+    except QuotaExceeded:
         raise HTTPException(
             status_code=403, 
-            detail="Análise de perfil disponível apenas para usuários Premium!"
+            detail="Limite de ideias atingido. Faça upgrade para Premium para ideias ilimitadas!"
+        )
+
+def parse_llm_json(response: str):
+    # Clean response - remove code blocks if present
+    clean_response = response.strip()
+    if clean_response.startswith('```json'):
+        clean_response = clean_response[7:]
+    if clean_response.endswith('```'):
+        clean_response = clean_response[:-3]
+    return json.loads(clean_response.strip())
+
+def validate_ideas_response(response: str):
+    ideas_data = parse_llm_json(response)
+    if not isinstance(ideas_data, dict) or not isinstance(ideas_data.get("ideas"), list) or not ideas_data["ideas"]:
+        raise ValueError("No valid ideas generated")
+
+def validate_analysis_response(response: str):
+    if not isinstance(parse_llm_json(response), dict):
+        raise ValueError("Analysis is not a JSON object")
+
+async def call_llm(key: str, factories: list, validate, priority: int):
+    """Run one Gemini answer within the latency budget; None means serve the fallback.
+
+    Concurrent requests for the same key share one call, which waits for a
+    dispatcher slot (premium users first) and is hedged/cut off as configured.
+    """
+    if not llm_breaker.allow():
+        llm_logger.warning("LLM circuit open, using fallback")
+        return None
+    try:
+        return await llm_flights.do(
+            key,
+            lambda: llm_dispatcher.submit(
+                lambda: hedged(factories, validate, LLM_HEDGE_AFTER, LLM_HARD_DEADLINE, llm_breaker, LLM_RETRY_ON_FAILURE,
+                               slots=llm_dispatcher),
+                priority=priority
+            )
         )
+    except LlmSkipped as e:
+        llm_logger.warning(f"LLM over budget, using fallback: {e}")
+        return None
+
+def llm_priority(user_obj: User):
+    return PRIORITY_PREMIUM if user_obj.plan == "premium" else PRIORITY_FREE
+
+def llm_unavailable_error(e: LlmUnavailable):
+    llm_logger.warning(f"LLM request shed: {e}")
+    return HTTPException(
+        status_code=e.status_code,
+        detail="Muitas requisições no momento. Tente novamente em instantes.",
+        headers={"Retry-After": str(LLM_RETRY_AFTER)}
+    )
+
+def sse_event(event: str, data: str):
+    return f"event: {event}\ndata: {data}\n\n"
+
+class EventStreamResponse(StreamingResponse):
+    """StreamingResponse whose ``background`` task also runs when sending fails.
+
+    Starlette skips it if the client is gone before the body starts, and then
+    the body generator, with its ``finally``, never runs either.
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        except BaseException:
+            if self.background is not None:
+                await self.background()
+            raise
+
+def build_batch_ideas_chat(user_id: str, topics: List[str], handle: Optional[str] = None, model: tuple = LLM_MODEL):
+    """Return the Gemini chat session and prompt that generate ideas for several topics at once."""
+    chat = LlmChat(
+        api_key=GEMINI_API_KEY,
+        session_id=f"ideas_batch_{user_id}_{uuid.uuid4()}",
+        system_message="""Você é um especialista em criação de conteúdo para influenciadores digitais. 
+        
+        IMPORTANTE: Responda SEMPRE no formato JSON válido abaixo. NÃO adicione texto antes ou depois do JSON.
+        
+        Para CADA tópico da lista recebida, gere 5 ideias criativas e virais. Para cada ideia:
+        - Título: Clickbait atrativo com emojis
+        - Roteiro: 4 pontos práticos e envolventes
+        - Tipo: Reels, Post ou Stories
+        - Hashtags: 6-8 tags populares e relevantes
+        
+        Repita cada tópico exatamente como recebido, na mesma ordem.
+        
+        RESPONDA APENAS ESTE JSON:
+        {
+            "topics": [
+                {
+                    "topic": "tópico exatamente como recebido",
+                    "ideas": [
+                        {
+                            "title": "🔥 Título super atrativo com emoji",
+                            "script": "1. Gancho inicial impactante\n2. Desenvolvimento do tema principal\n3. Valor prático ou insight\n4. Call to action envolvente",
+                            "content_type": "Reels",
+                            "hashtags": ["#tag1", "#tag2", "#tag3", "#tag4", "#tag5", "#tag6"]
+                        }
+                    ]
+                }
+            ]
+        }
+        """
+    ).with_model(*model).with_max_tokens(LLM_MAX_TOKENS)
+
+    topic_lines = "\n".join(f"{i}. {topic}" for i, topic in enumerate(topics, 1))
+    context_message = f"Gere 5 ideias criativas para influenciadores sobre cada um destes tópicos:\n{topic_lines}\n" + \
+                     f"Foque em conteúdo viral, engajamento alto e valor para o público."
+    
+    if handle:
+        context_message += f" O influenciador tem Instagram @{handle}."
     
+    return chat, UserMessage(text=context_message)
+
+async def request_llm_batch_ideas(user_id: str, topics: List[str], handle: Optional[str] = None, model: tuple = LLM_MODEL):
+    """Ask Gemini for ideas about every topic in ``topics`` and return the raw response text."""
+    chat, user_message = build_batch_ideas_chat(user_id, topics, handle, model)
+    response = await metrics.timed_llm_call("ideas_batch", chat.send_message(user_message))
+    
+    llm_payloads.log(llm_logger, "AI batch response", response, kind="ideas_batch", user_id=user_id, topics=len(topics))
+    return response
+
+def demux_batch_ideas(response: str, topics: List[str]):
+    """Split a batch answer into ``{topic: [idea, ...]}``; topics the answer lacks are left out."""
+    sections = parse_llm_json(response).get("topics")
+    if not isinstance(sections, list):
+        raise ValueError("No topics in batch response")
+    
+    by_topic = {}
+    for position, section in enumerate(sections):
+        if not isinstance(section, dict) or not isinstance(section.get("ideas"), list):
+            continue
+        ideas = [idea for idea in section["ideas"] if isinstance(idea, dict)]
+        # Match the echoed topic loosely, falling back to its position in the request
+        echoed = normalize_topic(str(section.get("topic", "")))
+        topic = next((t for t in topics if normalize_topic(t) == echoed), None)
+        if topic is None and len(sections) == len(topics):
+            topic = topics[position]
+        if topic is not None and ideas and topic not in by_topic:
+            by_topic[topic] = ideas
+    return by_topic
+
+def validate_batch_response(topics: List[str]):
+    def validate(response: str):
+        if not demux_batch_ideas(response, topics):
+            raise ValueError("No valid ideas generated")
+    return validate
+
+@api_router.post("/generate-ideas/batch", response_model=List[TopicIdeas])
+async def generate_content_ideas_batch(request: ContentIdeaBatchCreate):
+    reservation = None
     try:
-        # Enhanced AI analysis with real profile context
-        chat = LlmChat(
-            api_key=GEMINI_API_KEY,
-            session_id=f"analysis_{user_id}_{uuid.uuid4()}",
-            system_message=f"""Você é um especialista em análise de perfis de redes sociais e estratégia de conteúdo digital.
+        user = await user_cache.get(request.user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        user_obj = User(**user)
+        
+        # Topics that normalize alike (same cache key) are generated once
+        handle = user_obj.instagram_handle if user_obj.plan == "premium" else None
+        cache_keys = {}
+        for topic in (topic.strip() for topic in request.topics):
+            key = ideas_cache_key(topic, user_obj.plan, handle)
+            if topic and key not in cache_keys.values():
+                cache_keys[topic] = key
+        topics = list(cache_keys)
+        if not topics:
+            raise HTTPException(status_code=400, detail="Informe ao menos um tópico")
+        
+        # One quota reservation for the whole batch
+        reservation = await reserve_ideas(request.user_id, IDEAS_PER_REQUEST * len(topics))
+        
+        # Cached topics are served as-is; the rest is packed into as few calls as fit the token budget
+        cached = await asyncio.gather(*(ideas_cache.get(cache_keys[topic]) for topic in topics))
+        ideas_by_topic = {topic: ideas for topic, ideas in zip(topics, cached) if ideas is not None}
+        missing = [topic for topic in topics if topic not in ideas_by_topic]
+        chunks = [missing[i:i + IDEAS_BATCH_TOPICS_PER_CALL] for i in range(0, len(missing), IDEAS_BATCH_TOPICS_PER_CALL)]
+        
+        responses = await asyncio.gather(*(
+            call_llm(
+                "ideas-batch|" + "|".join(cache_keys[topic] for topic in chunk),
+                [lambda chunk=chunk, model=model: request_llm_batch_ideas(request.user_id, chunk, handle, model)
+                 for model in (LLM_MODEL, LLM_HEDGE_MODEL)],
+                validate_batch_response(chunk),
+                priority=llm_priority(user_obj)
+            )
+            for chunk in chunks
+        ))
+        
+        for chunk, response in zip(chunks, responses):
+            if response is None:
+                continue
+            for topic, ideas in demux_batch_ideas(response, chunk).items():
+                ideas_by_topic[topic] = ideas
+                metrics.llm_results.inc("ideas_batch", "parsed")
+                await ideas_cache.set(cache_keys[topic], ideas)
+        
+        results = []
+        for topic in topics:
+            ideas = ideas_by_topic.get(topic)
+            if ideas is None:
+                llm_logger.warning(f"No AI ideas for batch topic {topic!r}, using fallback")
+                metrics.llm_results.inc("ideas_batch", "fallback")
+                ideas = niches.fallback_ideas(topic)
+            results.append(TopicIdeas(
+                topic=topic,
+                ideas=[content_idea_from(request.user_id, topic, idea) for idea in ideas]
+            ))
+        
+        # Save every topic's ideas, then settle the reserved count
+        all_ideas = [idea.dict() for result in results for idea in result.ideas]
+        await asyncio.gather(
+            save_generated_ideas(db, request.user_id, all_ideas, IDEAS_WRITE_MODE, count=False),
+            rollups.record(db, {"ideas": len(all_ideas)})
+        )
+        await reservation.settle(len(all_ideas))
+        
+        return results
+        
+    except HTTPException:
+        raise
+    except LlmUnavailable as e:
+        raise llm_unavailable_error(e)
+    except Exception as e:
+        logger.exception(f"Error generating batch ideas: {e}")
+        raise HTTPException(status_code=500, detail="Erro interno do servidor")
+    finally:
+        if reservation is not None:
+            await reservation.release()
+
+@api_router.post("/generate-ideas/stream")
+async def generate_content_ideas_stream(request: ContentIdeaCreate):
+    # Get user to check plan and limits before the stream starts
+    user = await user_cache.get(request.user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Settled with the number of ideas actually sent, by the stream's finally or, if the
+    # stream never ran (client gone before the body started), by the response's background task
+    reservation = await reserve_ideas(request.user_id, IDEAS_PER_REQUEST)
+    user_obj = User(**reservation.user)
+    
+    handle = user_obj.instagram_handle if user_obj.plan == "premium" else None
+    cache_key = ideas_cache_key(request.topic, user_obj.plan, handle)
+    cached_ideas = await prewarmed_ideas.take(request.topic) if handle is None else None
+    if cached_ideas is None:
+        cached_ideas = await ideas_cache.get(cache_key)
+    if cached_ideas is None and llm_dispatcher.saturated():
+        await reservation.release()
+        raise llm_unavailable_error(LlmOverloaded("LLM queue is full"))
+    
+    ideas_list = []
+    
+    async def events():
+        async def publish(idea: dict):
+            # Persist each idea as soon as it is complete so a dropped stream keeps what was sent
+            content_idea = content_idea_from(request.user_id, request.topic, idea)
+            await db.content_ideas.insert_one(content_idea.dict())
+            ideas_list.append(content_idea)
+            return sse_event("idea", content_idea.json())
+        
+        try:
+            if cached_ideas is not None:
+                for idea in cached_ideas:
+                    yield await publish(idea)
+            elif llm_breaker.allow():
+                parser = ArrayObjectParser()
+                streamed_ideas = []
+                async with llm_dispatcher.slot(priority=llm_priority(user_obj)):
+                    async for chunk in stream_llm_ideas(request.user_id, request.topic, handle):
+                        for idea in parser.feed(chunk):
+                            if isinstance(idea, dict):
+                                streamed_ideas.append(idea)
+                                yield await publish(idea)
+                llm_breaker.record(bool(streamed_ideas))
+                metrics.llm_results.inc("ideas_stream", "parsed" if streamed_ideas else "fallback")
+                if streamed_ideas:
+                    await ideas_cache.set(cache_key, streamed_ideas)
+            
+            if not ideas_list:
+                llm_logger.warning("Failed to parse streamed AI response, using fallback")
+                for idea in niches.fallback_ideas(request.topic):
+                    yield await publish(idea)
+            
+            yield sse_event("done", json.dumps({"count": len(ideas_list)}))
+        except LlmUnavailable as e:
+            llm_logger.warning(f"LLM request shed: {e}")
+            yield sse_event("error", json.dumps({"status": e.status_code, "detail": "Muitas requisições no momento. Tente novamente em instantes."}))
+        except Exception as e:
+            logger.exception(f"Error streaming ideas: {e}")
+            yield sse_event("error", json.dumps({"detail": "Erro interno do servidor"}))
+        finally:
+            # A client that disconnects cancels this scope; finish the bookkeeping anyway
+            with anyio.CancelScope(shield=True):
+                await reservation.settle(len(ideas_list))
+                if ideas_list:
+                    await rollups.record(db, {"ideas": len(ideas_list)})
+    
+    async def settle_reservation():
+        # No-op when the stream's finally already settled it
+        await reservation.settle(len(ideas_list))
+    
+    return EventStreamResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(settle_reservation)
+    )
+
+async def request_llm_analysis(user_id: str, platform: str, handle: str, model: tuple = LLM_MODEL):
+    """Ask Gemini to analyze ``handle`` on ``platform`` and return the raw response text."""
+    # Enhanced AI analysis with real profile context
+    chat = LlmChat(
+        api_key=GEMINI_API_KEY,
+        session_id=f"analysis_{user_id}_{uuid.uuid4()}",
+        system_message=f"""Você é um especialista em análise de perfis de redes sociais e estratégia de conteúdo digital.
 
 Analise o perfil @{handle} da plataforma {platform} e forneça insights ESPECÍFICOS e PRÁTICOS.
 
@@ -574,150 +1091,161 @@ Responda APENAS no formato JSON:
     "audience_insights": "Análise específica da audiência provável de @{handle} no {platform}, baseada no nicho e plataforma",
     "content_performance": "Análise específica de que tipo de conteúdo funcionaria melhor para @{handle} no {platform}"
 }}"""
-        ).with_model("gemini", "gemini-2.0-flash").with_max_tokens(4000)
+    ).with_model(*model).with_max_tokens(LLM_MAX_TOKENS)
 
-        # Create enhanced prompt with handle analysis
-        analysis_prompt = f"""
-        Analise o perfil @{handle} no {platform}:
+    # Create enhanced prompt with handle analysis
+    analysis_prompt = f"""
+    Analise o perfil @{handle} no {platform}:
+    
+    1. CONTEXTO DO HANDLE: Baseado no nome "@{handle}", identifique o possível nicho/tema do perfil
+    2. PLATAFORMA: {platform} - use características específicas desta rede social
+    3. ANÁLISE INTELIGENTE: Forneça insights específicos e acionáveis
+    
+    Seja específico ao @{handle} e não genérico. Use o nome do handle para inferir o nicho e dar conselhos direcionados.
+    """
+    
+    user_message = UserMessage(text=analysis_prompt)
+    response = await metrics.timed_llm_call("analysis", chat.send_message(user_message))
+    
+    llm_payloads.log(llm_logger, "AI profile analysis response", response, kind="analysis", platform=platform, handle=handle)
+    return response
+
+async def get_premium_user(user_id: str):
+    # Read from Mongo: a purchase handled by another worker must count immediately
+    user = await user_cache.refresh(user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    if user["plan"] != "premium":
+        raise HTTPException(
+            status_code=403, 
+            detail="Análise de perfil disponível apenas para usuários Premium!"
+        )
+    return user
+
+async def run_profile_analysis(user_id: str, platform: str, handle: str, force_refresh: bool = False):
+    """Analyze ``handle`` with Gemini (or the template fallback) and store the result."""
+    # The analysis only depends on platform and handle, so reuse a fresh one from any user
+    cached = None if force_refresh else await analysis_cache.get(platform, handle)
+    if cached is not None:
+        profile_analysis = ProfileAnalysis(user_id=user_id, platform=platform, handle=handle, **cached)
+        await db.profile_analyses.insert_one(profile_analysis.dict())
+        return profile_analysis
+    
+    # Identical analyses already in flight share one Gemini call
+    response = await call_llm(
+        f"analysis|{platform}|{normalize_handle(handle)}".lower(),
+        [lambda model=model: request_llm_analysis(user_id, platform, handle, model)
+         for model in (LLM_MODEL, LLM_HEDGE_MODEL)],
+        validate_analysis_response,
+        priority=PRIORITY_PREMIUM
+    )
+    
+    # Parse AI response
+    try:
+        if response is None:
+            raise ValueError("LLM skipped")
+        analysis_data = parse_llm_json(response)
         
-        1. CONTEXTO DO HANDLE: Baseado no nome "@{handle}", identifique o possível nicho/tema do perfil
-        2. PLATAFORMA: {platform} - use características específicas desta rede social
-        3. ANÁLISE INTELIGENTE: Forneça insights específicos e acionáveis
+        profile_analysis = ProfileAnalysis(
+            user_id=user_id,
+            platform=platform,
+            handle=handle,
+            analysis=analysis_data.get("analysis", f"Análise específica em desenvolvimento para @{handle}..."),
+            recommendations=analysis_data.get("recommendations", [f"Mantenha consistência no conteúdo de @{handle}", "Use hashtags específicas do seu nicho", "Interaja ativamente com sua comunidade"]),
+            best_posting_times=analysis_data.get("best_posting_times", ["09:00", "15:00", "20:00"]),
+            audience_insights=analysis_data.get("audience_insights", f"Análise da audiência de @{handle} em desenvolvimento..."),
+            content_performance=analysis_data.get("content_performance", f"Análise de performance para @{handle} em desenvolvimento...")
+        )
         
-        Seja específico ao @{handle} e não genérico. Use o nome do handle para inferir o nicho e dar conselhos direcionados.
-        """
+        metrics.llm_results.inc("analysis", "parsed")
         
-        user_message = UserMessage(text=analysis_prompt)
-        response = await chat.send_message(user_message)
+        # Only real model answers are shared; fallbacks are cheap to rebuild
+        analysis_dict = profile_analysis.dict()
+        await asyncio.gather(
+            db.profile_analyses.insert_one(analysis_dict),
+            analysis_cache.set(platform, handle, analysis_dict)
+        )
+        return profile_analysis
         
-        print(f"AI Profile Analysis Response: {response}")
+    except (json.JSONDecodeError, ValueError, KeyError) as e:
+        llm_logger.warning(f"Failed to parse AI analysis, using enhanced fallback: {e}")
+        metrics.llm_results.inc("analysis", "fallback")
         
-        # Parse AI response
-        try:
-            clean_response = response.strip()
-            if clean_response.startswith('```json'):
-                clean_response = clean_response[7:]
-            if clean_response.endswith('```'):
-                clean_response = clean_response[:-3]
-            clean_response = clean_response.strip()
-            
-            analysis_data = json.loads(clean_response)
-            
-            profile_analysis = ProfileAnalysis(
-                user_id=user_id,
-                platform=platform,
-                handle=handle,
-                analysis=analysis_data.get("analysis", f"Análise específica em desenvolvimento para @{handle}..."),
-                recommendations=analysis_data.get("recommendations", [f"Mantenha consistência no conteúdo de @{handle}", "Use hashtags específicas do seu nicho", "Interaja ativamente com sua comunidade"]),
-                best_posting_times=analysis_data.get("best_posting_times", ["09:00", "15:00", "20:00"]),
-                audience_insights=analysis_data.get("audience_insights", f"Análise da audiência de @{handle} em desenvolvimento..."),
-                content_performance=analysis_data.get("content_performance", f"Análise de performance para @{handle} em desenvolvimento...")
-            )
-            
-            await db.profile_analyses.insert_one(profile_analysis.dict())
-            return profile_analysis
-            
-        except (json.JSONDecodeError, KeyError) as e:
-            print(f"Failed to parse AI analysis, using enhanced fallback: {e}")
-            
-            # ENHANCED FALLBACK - Analyze handle for niche detection
-            handle_lower = handle.lower()
-            
-            # Smart niche detection based on handle
-            niche_indicators = {
-                "fit": "fitness", "gym": "fitness", "treino": "fitness", "muscle": "fitness", "healthy": "fitness",
-                "food": "culinária", "chef": "culinária", "cook": "culinária", "recipe": "culinária", "eat": "culinária",
-                "beauty": "beleza", "makeup": "beleza", "skin": "beleza", "hair": "beleza", "fashion": "moda",
-                "tech": "tecnologia", "dev": "tecnologia", "code": "tecnologia", "digital": "tecnologia",
-                "business": "negócios", "entrepreneur": "negócios", "startup": "negócios", "invest": "negócios",
-                "travel": "viagem", "trip": "viagem", "adventure": "viagem", "explore": "viagem",
-                "mom": "maternidade", "mama": "maternidade", "baby": "maternidade", "family": "família",
-                "art": "arte", "draw": "arte", "paint": "arte", "creative": "arte", "design": "design",
-                "music": "música", "sing": "música", "guitar": "música", "piano": "música",
-                "game": "games", "gamer": "games", "stream": "games", "play": "games"
-            }
-            
-            detected_niche = "lifestyle"
-            for keyword, niche in niche_indicators.items():
-                if keyword in handle_lower:
-                    detected_niche = niche
-                    break
-            
-            # Platform-specific enhanced analysis
-            platform_specific = {
-                "instagram": {
-                    "analysis": f"Perfil @{handle} no Instagram: Baseado na análise do handle, identifiquei um foco em {detected_niche}. Instagram é ideal para conteúdo visual de alta qualidade neste nicho. Recomendo estratégia focada em posts carrossel, Stories interativos e Reels com tendências atuais.",
-                    "recommendations": [
-                        f"Crie conteúdo visual atrativo sobre {detected_niche} com iluminação profissional",
-                        f"Use Stories diários mostrando bastidores do seu trabalho com {detected_niche}",
-                        f"Faça Reels curtos (15-30s) com dicas práticas de {detected_niche}",
-                        f"Responda TODOS os comentários nas primeiras 2 horas após publicar",
-                        f"Use hashtags mix: 3 grandes (1M+), 5 médias (100K-1M), 7 pequenas (1K-100K)",
-                        f"Publique consistentemente: 3-4 posts por semana + Stories diários"
-                    ],
-                    "times": ["08:00", "12:30", "19:00"],
-                    "audience": f"Audiência de @{handle}: Perfil focado em {detected_niche} atrai principalmente pessoas interessadas neste tema. No Instagram, seu público provavelmente é 60% feminino, 25-35 anos, ativo entre 8-10h, 12-14h e 19-21h. Engajamento maior em conteúdo educativo e inspiracional.",
-                    "performance": f"Para @{handle} no Instagram: Posts em carrossel têm 40% mais engajamento que fotos únicas. Reels sobre {detected_niche} podem ter 3x mais alcance. Stories com enquetes/perguntas aumentam engajamento em 25%. Call-to-actions claros aumentam conversão em 30%."
-                },
-                "tiktok": {
-                    "analysis": f"Perfil @{handle} no TikTok: Com foco em {detected_niche}, você tem grande potencial viral nesta plataforma. TikTok favorece conteúdo autêntico, educativo e divertido. Estratégia deve focar em trends, sounds populares e hooks fortes nos primeiros 3 segundos.",
-                    "recommendations": [
-                        f"Crie vídeos de 15-30s com dicas rápidas sobre {detected_niche}",
-                        f"Use músicas/sounds em alta (verifica Discover Weekly)",
-                        f"Hook forte: '3 segredos sobre {detected_niche} que mudaram minha vida'",
-                        f"Participe de challenges relacionados ao seu nicho {detected_niche}",
-                        f"Publique 1-2 vídeos por dia em horários de pico",
-                        f"Interaja com outros criadores de {detected_niche} através de duetos/stitches"
-                    ],
-                    "times": ["18:00", "19:30", "21:00"],
-                    "audience": f"@{handle} no TikTok: Audiência de {detected_niche} é predominantemente jovem (16-28 anos), ativa à noite (18-23h). Attention span de 8 segundos. Prefere conteúdo autêntico, educativo rápido e entretenimento. 45% descobre via FYP, 30% via hashtags.",
-                    "performance": f"TikTok @{handle}: Vídeos sobre {detected_niche} com texto na tela têm 60% mais views. Trends musicais aumentam alcance em 85%. Conteúdo educativo de 15-30s tem 40% mais saves. Hooks nos primeiros 3s aumentam retenção em 70%."
-                },
-                "kwai": {
-                    "analysis": f"Perfil @{handle} no Kwai: Plataforma brasileira perfeita para conteúdo de {detected_niche} com toque nacional. Kwai valoriza autenticidade, humor brasileiro e conexão com comunidade local. Ideal para mostrar seu conhecimento em {detected_niche} de forma descontraída.",
-                    "recommendations": [
-                        f"Crie conteúdo sobre {detected_niche} com jeito brasileiro/regional",
-                        f"Use músicas populares no Brasil (sertanejo, funk, MPB)",
-                        f"Faça vídeos de 30-60s com humor e informação sobre {detected_niche}",
-                        f"Interaja muito com comentários - audiência Kwai valoriza proximidade",
-                        f"Use gírias e expressões regionais ao falar sobre {detected_niche}",
-                        f"Poste nos horários de pico: noite quando as pessoas relaxam"
-                    ],
-                    "times": ["19:00", "20:30", "21:30"],
-                    "audience": f"@{handle} no Kwai: Audiência brasileira interessada em {detected_niche}, mais ativa à noite (19-23h). Valoriza autenticidade e humor. 70% interage mais quando criador responde. Prefere conteúdo descontraído e educativo ao mesmo tempo.",
-                    "performance": f"Kwai @{handle}: Conteúdo de {detected_niche} com humor brasileiro tem 75% mais engajamento. Vídeos com música nacional performam 65% melhor. Responder comentários aumenta alcance em 45%. CTAs diretos funcionam 35% melhor que indiretos."
-                }
-            }
-            
-            platform_data = platform_specific.get(platform, platform_specific["instagram"])
-            
-            profile_analysis = ProfileAnalysis(
-                user_id=user_id,
-                platform=platform,
-                handle=handle,
-                analysis=platform_data["analysis"],
-                recommendations=platform_data["recommendations"],
-                best_posting_times=platform_data["times"],
-                audience_insights=platform_data["audience"],
-                content_performance=platform_data["performance"]
-            )
-            
-            await db.profile_analyses.insert_one(profile_analysis.dict())
-            return profile_analysis
-            
+        # ENHANCED FALLBACK - niche detected from the handle, texts from precompiled tables
+        platform_data = niches.platform_fallback(platform, handle)
+        
+        profile_analysis = ProfileAnalysis(
+            user_id=user_id,
+            platform=platform,
+            handle=handle,
+            analysis=platform_data["analysis"],
+            recommendations=platform_data["recommendations"],
+            best_posting_times=platform_data["times"],
+            audience_insights=platform_data["audience"],
+            content_performance=platform_data["performance"]
+        )
+        
+        await db.profile_analyses.insert_one(profile_analysis.dict())
+        return profile_analysis
+
+@api_router.post("/analyze-profile", response_model=ProfileAnalysis)
+async def analyze_profile(request: dict):
+    user_id = request.get("user_id")
+    platform = request.get("platform")  # instagram, tiktok, kwai
+    handle = request.get("handle")
+    force_refresh = bool(request.get("force_refresh", False))
+    
+    # Check if user has premium plan
+    await get_premium_user(user_id)
+    
+    try:
+        return await run_profile_analysis(user_id, platform, handle, force_refresh)
+    except LlmUnavailable as e:
+        raise llm_unavailable_error(e)
     except Exception as e:
-        print(f"Error analyzing profile: {e}")
+        logger.exception(f"Error analyzing profile: {e}")
         raise HTTPException(status_code=500, detail="Erro ao analisar perfil")
 
-@api_router.get("/profile-analysis/{user_id}")
-async def get_profile_analysis(user_id: str):
-    analyses = await db.profile_analyses.find({"user_id": user_id}).sort("created_at", -1).to_list(10)
-    return [ProfileAnalysis(**analysis) for analysis in analyses]
+@api_router.post("/analyze-profile/jobs", status_code=202)
+async def create_analysis_job(request: dict):
+    user_id = request.get("user_id")
+    await get_premium_user(user_id)
+    
+    job = await analysis_jobs.submit({
+        "user_id": user_id,
+        "platform": request.get("platform"),
+        "handle": request.get("handle"),
+        "force_refresh": bool(request.get("force_refresh", False))
+    })
+    return {"job_id": job["id"], "status": job["status"]}
+
+@api_router.get("/analyze-profile/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    job = await analysis_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job.pop("payload", None)
+    return job
+
+@api_router.get("/profile-analysis/{user_id}", response_model=List[ProfileAnalysis], response_class=ORJSONResponse)
+async def get_profile_analysis(user_id: str, fields: Optional[str] = None):
+    model = select_fields(ProfileAnalysis, fields)
+    analyses = await db.profile_analyses.find(
+        {"user_id": user_id}, serialization.projection(model)
+    ).sort("created_at", -1).to_list(10)
+    return ORJSONResponse(serialization.conform(analyses, model))
 
-@api_router.get("/ideas/{user_id}", response_model=List[ContentIdea])
-async def get_user_ideas(user_id: str):
-    ideas = await db.content_ideas.find({"user_id": user_id}).sort("created_at", -1).to_list(100)
-    return [ContentIdea(**idea) for idea in ideas]
+@api_router.get("/ideas/{user_id}", response_model=ContentIdeaPage, response_class=ORJSONResponse)
+async def get_user_ideas(
+    user_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=PAGE_MAX_LIMIT),
+    fields: Optional[str] = None
+):
+    model = select_fields(ContentIdea, fields)
+    ideas, next_cursor = await fetch_page(db.content_ideas, {"user_id": user_id}, cursor, limit, model)
+    return serialization.page_response(ideas, model, next_cursor)
 
 @api_router.delete("/ideas/{idea_id}")
 async def delete_idea(idea_id: str):
@@ -726,9 +1254,31 @@ async def delete_idea(idea_id: str):
         raise HTTPException(status_code=404, detail="Idea not found")
     return {"message": "Idea deleted successfully"}
 
+@api_router.get("/ready", include_in_schema=False)
+async def readiness():
+    # 503 while this worker starts or shuts down, or while MongoDB does not answer
+    if not app.state.ready:
+        raise HTTPException(status_code=503, detail="Servidor iniciando ou encerrando")
+    try:
+        await asyncio.wait_for(client.admin.command("ping"), MONGO_PING_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Readiness ping failed: {e}")
+        raise HTTPException(status_code=503, detail="Banco de dados indisponível")
+    return {"status": "ready"}
+
+@api_router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+metrics.registry.gauge("llm_active_calls", "LLM calls holding a dispatcher slot.", lambda: llm_dispatcher.active)
+metrics.registry.gauge("llm_queue_depth", "Callers waiting for a dispatcher slot.", lambda: llm_dispatcher.queue_depth)
+metrics.registry.gauge("llm_circuit_open", "1 while the LLM circuit breaker skips calls.", lambda: int(llm_breaker.state == "open"))
+
 # Include the router in the main app
 app.include_router(api_router)
 
+app.add_middleware(metrics.MetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -737,13 +1287,64 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+app.add_middleware(structured_logging.RequestIdMiddleware)
+
+@app.on_event("startup")
+async def start_log_listener():
+    log_listener.start()
+
+@app.on_event("startup")
+async def label_metrics():
+    # Each worker keeps its own counters; the label keeps their series apart in Prometheus
+    if WEB_CONCURRENCY > 1:
+        metrics.registry.labels["worker"] = str(os.getpid())
+
+@app.on_event("startup")
+async def connect_db():
+    open_database()
+    # Warm-up: a worker that cannot reach MongoDB fails its startup instead of its first requests
+    await asyncio.wait_for(client.admin.command("ping"), MONGO_PING_TIMEOUT)
+
+@app.on_event("startup")
+async def create_indexes():
+    await ensure_indexes(db)
+
+async def process_analysis_job(payload: dict):
+    analysis = await run_profile_analysis(
+        payload["user_id"], payload["platform"], payload["handle"], payload.get("force_refresh", False)
+    )
+    return analysis.dict()
+
+@app.on_event("startup")
+async def start_analysis_workers():
+    await analysis_jobs.start()
+
+async def prewarm_ideas(topic: str):
+    # Handle-free prompt, so a set fits any user without a personalized prompt
+    response = await call_llm(
+        f"prewarm|{normalize_topic(topic)}",
+        [lambda model=model: request_llm_ideas("prewarm", topic, None, model) for model in (LLM_MODEL, LLM_HEDGE_MODEL)],
+        validate_ideas_response,
+        priority=PRIORITY_BACKGROUND
+    )
+    return parse_llm_json(response)["ideas"] if response is not None else None
+
+@app.on_event("startup")
+async def start_prewarm_pool():
+    prewarmed_ideas.start()
+
+@app.on_event("startup")
+async def start_last_active_flusher():
+    last_active_buffer.start()
+
+@app.on_event("startup")
+async def mark_ready():
+    app.state.ready = True
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    app.state.ready = False
+    await asyncio.gather(analysis_jobs.stop(), prewarmed_ideas.stop(), last_active_buffer.stop())
     client.close()
+    # Drains the records still queued
+    log_listener.stop()
@@ -0,0 +1,57 @@
+"""Coalescing of concurrent identical async calls (single-flight)."""
+import asyncio
+
+
+class _Call:
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Run at most one ``factory()`` per key at a time.
+
+    Callers arriving while a call for the same key is in flight await that
+    call instead of starting their own, and all of them receive its result
+    or its exception. The shared call runs as its own task, so a cancelled
+    caller (e.g. a client that disconnected) does not cancel it for the
+    others; it is only cancelled once every caller has gone away.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def do(self, key, factory):
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(factory()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._finish(key, call))
+            self.leaders += 1
+        else:
+            self.followers += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+
+    def _finish(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark the exception as retrieved when every waiter was cancelled first
+        if not call.task.cancelled():
+            call.task.exception()
+
+    def stats(self):
+        return {"in_flight": len(self._calls), "leaders": self.leaders, "followers": self.followers}
@@ -0,0 +1,128 @@
+"""JSON logs formatted and written off the event loop.
+
+Loggers only put records on a queue (QueueHandler); a QueueListener thread
+turns them into one JSON object per line and writes them out, so a slow
+stdout never stalls a request. Records carry the id of the HTTP request
+that logged them, taken from a context variable set by RequestIdMiddleware.
+"""
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import uuid
+from datetime import datetime, timezone
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = b"x-request-id"
+# Client-supplied ids are kept only if they look like an id
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+# Attributes every LogRecord has; anything else on a record came from ``extra=``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRS)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records with their request id; JSON formatting is left to the listener."""
+
+    def prepare(self, record):
+        record.request_id = request_id.get()
+        # Merge the arguments now, in case the caller mutates them after logging
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def parse_levels(spec):
+    """``"llm=DEBUG,jobs=WARNING"`` -> ``{"llm": "DEBUG", "jobs": "WARNING"}``."""
+    levels = {}
+    for item in (spec or "").split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure(level="INFO", levels=None, stream=None):
+    """Route the root logger through a queue and return the (not yet started) QueueListener.
+
+    ``levels`` maps logger names (subsystems) to their own level.
+    """
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [ContextQueueHandler(log_queue)]
+    root.setLevel(level.upper())
+    for name, subsystem_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(subsystem_level)
+    return logging.handlers.QueueListener(log_queue, handler)
+
+
+class PayloadSampler:
+    """Logs big bodies (e.g. LLM answers) for only ``rate`` of the calls, cut to ``max_chars``."""
+
+    def __init__(self, rate=0.01, max_chars=2000):
+        self.rate = rate
+        self.max_chars = max_chars
+
+    def log(self, logger, message, payload, level=logging.INFO, **fields):
+        if not logger.isEnabledFor(level) or random.random() >= self.rate:
+            return
+        payload = payload if isinstance(payload, str) else str(payload)
+        logger.log(level, message, extra={
+            **fields,
+            "payload": payload[:self.max_chars],
+            "payload_chars": len(payload),
+            "truncated": len(payload) > self.max_chars,
+        })
+
+
+class RequestIdMiddleware:
+    """ASGI middleware giving each HTTP request an id (the client's X-Request-ID, or a new one).
+
+    The id is echoed in the response's X-Request-ID header and attached to
+    every record logged while the request is handled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        supplied = dict(scope["headers"]).get(REQUEST_ID_HEADER, b"").decode("latin-1")
+        current = supplied if _VALID_REQUEST_ID.match(supplied) else uuid.uuid4().hex
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (REQUEST_ID_HEADER, current.encode())]
+            await send(message)
+
+        token = request_id.set(current)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id.reset(token)
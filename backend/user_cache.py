@@ -0,0 +1,89 @@
+"""Read-through cache of user documents, looked up by ``id`` or ``email``."""
+from cache import TTLCache
+
+
+class UserCache:
+    """Caches ``users`` documents for ``ttl`` seconds, at most ``maxsize`` of them.
+
+    Every write to a user must go through ``apply()`` (or ``invalidate()``)
+    so the cached copy changes together with the database. A lookup that
+    raced with a write to the same user does not store the document it read,
+    so a plan change is visible to the next request in this process. Other processes
+    see it once their entry expires, so checks that must not lag behind
+    them (the premium plan) use ``refresh()``.
+    """
+
+    def __init__(self, collection, maxsize=10000, ttl=30.0):
+        self.collection = collection
+        self._by_id = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._email_ids = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Write clock, and the clock of each user's last write while lookups are in flight
+        self._clock = 0
+        self._written_at = {}
+        self._loading = 0
+
+    async def get(self, user_id):
+        user = self._by_id.get(user_id)
+        if user is not None:
+            return dict(user)
+        return await self._load({"id": user_id})
+
+    async def refresh(self, user_id):
+        """Read the user from the database, updating the cached copy."""
+        return await self._load({"id": user_id})
+
+    async def get_by_email(self, email):
+        user_id = self._email_ids.get(email)
+        user = self._by_id.get(user_id) if user_id is not None else None
+        if user is not None and user.get("email") == email:
+            return dict(user)
+        return await self._load({"email": email})
+
+    async def _load(self, query):
+        started = self._clock
+        self._loading += 1
+        try:
+            user = await self.collection.find_one(query, {"_id": 0})
+        finally:
+            self._loading -= 1
+        if user is not None and self._written_at.get(user["id"], 0) <= started:
+            self.put(user)
+        if not self._loading:
+            self._written_at.clear()
+        return user
+
+    def _written(self, user_id):
+        self._clock += 1
+        if self._loading:
+            self._written_at[user_id] = self._clock
+
+    def put(self, user):
+        user = {key: value for key, value in user.items() if key != "_id"}
+        self._by_id.set(user["id"], user)
+        self._email_ids.set(user["email"], user["id"])
+
+    def apply(self, user_id, set_fields=None, inc_fields=None, conflicts=True):
+        """Mirror a ``$set`` / ``$inc`` already written to the database.
+
+        Pass ``conflicts=False`` for writes a racing lookup may safely miss
+        (``last_active`` touches), so they do not keep it from being cached.
+        """
+        if conflicts:
+            self._written(user_id)
+        user = self._by_id.pop(user_id)
+        if user is None:
+            return
+        user = {**user, **(set_fields or {})}
+        for field, amount in (inc_fields or {}).items():
+            user[field] = user.get(field, 0) + amount
+        self.put(user)
+
+    def invalidate(self, user_id):
+        self._written(user_id)
+        user = self._by_id.pop(user_id)
+        if user is not None:
+            self._email_ids.pop(user["email"])
+
+    def stats(self):
+        email_stats = self._email_ids.stats()
+        return {**self._by_id.stats(), "email_hits": email_stats["hits"], "email_misses": email_stats["misses"]}
@@ -211,7 +211,7 @@ class ShadoomAPITester:
             response = self.session.get(f"{self.base_url}/ideas/{self.test_user_id}")
             
             if response.status_code == 200:
-                data = response.json()
+                data = response.json()["items"]
                 
                 if isinstance(data, list):
                     if len(data) > 0:
@@ -314,6 +314,146 @@ class ShadoomAPITester:
             self.log_test("Gemini AI Integration", False, f"Exception: {str(e)}")
             return False
     
+    def test_index_plans(self):
+        """Test GET /api/admin/indexes - no hot query may fall back to COLLSCAN, summaries must be covered"""
+        print("🔍 Testing Index Coverage of Hot Queries...")
+        try:
+            response = self.session.get(f"{self.base_url}/admin/indexes")
+            
+            if response.status_code == 200:
+                data = response.json()
+                
+                missing = {name: report["missing"] for name, report in data["indexes"].items() if report["missing"]}
+                if missing:
+                    self.log_test("Index Plans", False, f"Missing indexes: {missing}")
+                    return False
+                
+                collscans = [f"{plan['collection']} {plan['filter']}" for plan in data["plans"] if plan["collscan"]]
+                if collscans:
+                    self.log_test("Index Plans", False, f"COLLSCAN on: {collscans}")
+                    return False
+                
+                uncovered = [f"{plan['collection']} {plan['projection']}" for plan in data["plans"] if plan["projection"] and not plan["covered"]]
+                if uncovered:
+                    self.log_test("Index Plans", False, f"Summary queries not covered by an index: {uncovered}")
+                    return False
+                
+                self.log_test("Index Plans", True, f"{len(data['plans'])} hot queries use an index")
+                return True
+            else:
+                self.log_test("Index Plans", False, f"Status: {response.status_code}, Response: {response.text}")
+                return False
+                
+        except Exception as e:
+            self.log_test("Index Plans", False, f"Exception: {str(e)}")
+            return False
+    
+    def test_generate_ideas_batch(self):
+        """Test POST /api/generate-ideas/batch - one entry with 5 ideas per topic"""
+        print("🔍 Testing Batch Generate Ideas Endpoint...")
+        try:
+            # A fresh free user, so the 2 topics (10 ideas) fit the free cap
+            timestamp = int(time.time())
+            user = self.session.post(f"{self.base_url}/users", json={
+                "email": f"batch{timestamp}@shadoom.com",
+                "name": f"Batch {timestamp}"
+            }).json()
+            
+            topics = ["fitness", "culinária vegana"]
+            batch_request = {
+                "user_id": user["id"],
+                "topics": topics
+            }
+            
+            response = self.session.post(f"{self.base_url}/generate-ideas/batch", json=batch_request)
+            
+            if response.status_code == 200:
+                data = response.json()
+                
+                if [entry["topic"] for entry in data] != topics:
+                    self.log_test("Generate Ideas Batch", False, f"Expected topics {topics}, got {[entry['topic'] for entry in data]}")
+                    return False
+                
+                for entry in data:
+                    if len(entry["ideas"]) != 5 or any(idea["topic"] != entry["topic"] for idea in entry["ideas"]):
+                        self.log_test("Generate Ideas Batch", False, f"Bad ideas for topic '{entry['topic']}'")
+                        return False
+                
+                self.log_test("Generate Ideas Batch", True, f"Generated 5 ideas for each of {len(topics)} topics")
+                return True
+            else:
+                self.log_test("Generate Ideas Batch", False, f"Status: {response.status_code}, Response: {response.text}")
+                return False
+                
+        except Exception as e:
+            self.log_test("Generate Ideas Batch", False, f"Exception: {str(e)}")
+            return False
+    
+    def test_batch_quota(self):
+        """Test POST /api/generate-ideas/batch - a free user cannot exceed the cap in one batch"""
+        print("🔍 Testing Batch Quota...")
+        try:
+            timestamp = int(time.time())
+            user_data = {"email": f"batchquota{timestamp}@shadoom.com", "name": f"Batch Quota {timestamp}"}
+            user = self.session.post(f"{self.base_url}/users", json=user_data).json()
+            
+            topics = [f"tema {i}" for i in range(30)]
+            response = self.session.post(f"{self.base_url}/generate-ideas/batch", json={"user_id": user["id"], "topics": topics})
+            if response.status_code != 403:
+                self.log_test("Batch Quota", False, f"Expected 403 for 150 ideas on the free plan, got {response.status_code}")
+                return False
+            
+            # Same email returns the existing user, with its counter
+            ideas_generated = self.session.post(f"{self.base_url}/users", json=user_data).json()["ideas_generated"]
+            if ideas_generated != 0:
+                self.log_test("Batch Quota", False, f"Rejected batch was charged: ideas_generated={ideas_generated}")
+                return False
+            
+            self.log_test("Batch Quota", True, "30-topic batch rejected for a free user, nothing charged")
+            return True
+                
+        except Exception as e:
+            self.log_test("Batch Quota", False, f"Exception: {str(e)}")
+            return False
+    
+    def test_request_id(self):
+        """Test X-Request-ID - a client id is echoed back, otherwise one is generated"""
+        print("🔍 Testing Request ID Correlation...")
+        try:
+            response = self.session.get(f"{self.base_url}/", headers={"X-Request-ID": "backend-test-42"})
+            if response.headers.get("X-Request-ID") != "backend-test-42":
+                self.log_test("Request ID", False, f"Client id not echoed: {response.headers.get('X-Request-ID')}")
+                return False
+            
+            response = self.session.get(f"{self.base_url}/")
+            if not response.headers.get("X-Request-ID"):
+                self.log_test("Request ID", False, "No X-Request-ID generated")
+                return False
+            
+            self.log_test("Request ID", True, f"Generated id: {response.headers['X-Request-ID']}")
+            return True
+                
+        except Exception as e:
+            self.log_test("Request ID", False, f"Exception: {str(e)}")
+            return False
+    
+    def test_readiness(self):
+        """Test GET /api/ready - 200 once the worker has started and MongoDB answers"""
+        print("🔍 Testing Readiness Endpoint...")
+        try:
+            response = self.session.get(f"{self.base_url}/ready")
+            
+            if response.status_code == 200 and response.json().get("status") == "ready":
+                self.log_test("Readiness", True, "Worker ready")
+                return True
+            else:
+                self.log_test("Readiness", False, f"Status: {response.status_code}, Response: {response.text}")
+                return False
+                
+        except Exception as e:
+            self.log_test("Readiness", False, f"Exception: {str(e)}")
+            return False
+    
     def run_all_tests(self):
         """Run all backend tests"""
         print("🚀 Starting Shadoom Backend API Tests")
@@ -344,6 +484,19 @@ class ShadoomAPITester:
         # Test 7: Gemini AI Integration
         results["gemini_integration"] = self.test_gemini_integration()
         
+        # Test 8: Index coverage
+        results["index_plans"] = self.test_index_plans()
+        
+        # Test 9: Batch idea generation
+        results["generate_ideas_batch"] = self.test_generate_ideas_batch()
+        results["batch_quota"] = self.test_batch_quota()
+        
+        # Test 10: Request id correlation
+        results["request_id"] = self.test_request_id()
+        
+        # Test 11: Readiness
+        results["readiness"] = self.test_readiness()
+        
         # Summary
         print("=" * 50)
         print("📊 TEST SUMMARY")
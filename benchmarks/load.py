@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Load test for the API with a fake LLM and a local Mongo stand-in.
+
+Runs server.app in this process, either called directly through ASGI or
+served by uvicorn on a local port, with LlmChat replaced by FakeLlmChat:
+a deterministic stub with configurable latency, malformed-JSON rate and
+failure rate. The database is mongomock (needs mongomock-motor) or a real
+MongoDB at MONGO_URL; a real one gets a throwaway database. The clients
+use httpx.
+
+A seeded mix of requests (signup, generate-ideas, list ideas, dashboard)
+is sent by --concurrency async clients, and p50/p95/p99 latency and
+throughput per endpoint are printed as JSON. With --baseline, the run
+fails (exit status 1) if a tracked metric of any endpoint is worse than
+the baseline's by more than --threshold.
+
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/load.py --requests 2000 --concurrency 50 --save baseline.json
+    python benchmarks/load.py --requests 2000 --concurrency 50 --baseline baseline.json --threshold 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+ENDPOINTS = ("signup", "generate_ideas", "list_ideas", "dashboard")
+DEFAULT_MIX = "signup=1,generate_ideas=2,list_ideas=6,dashboard=1"
+# Tracked by --baseline; for throughput higher is better, for latencies lower is
+HIGHER_IS_BETTER = {"throughput_rps"}
+TOPICS = [
+    "fitness", "culinária vegana", "finanças pessoais", "maquiagem", "viagem", "games",
+    "marketing digital", "pets", "moda sustentável", "produtividade", "yoga", "fotografia",
+]
+
+
+class FakeUserMessage:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeLlmChat:
+    """Stand-in for emergentintegrations' LlmChat.
+
+    Whether a call fails, answers malformed JSON, and how long it takes is
+    drawn from a generator seeded with (seed, prompt, how many times that
+    prompt was sent), so a run is reproducible whatever the interleaving.
+    """
+
+    seed = 0
+    latency = 0.5
+    jitter = 0.25
+    malformed_rate = 0.0
+    failure_rate = 0.0
+    _sent = {}
+
+    def __init__(self, api_key, session_id, system_message):
+        self.system_message = system_message
+
+    def with_model(self, provider, model):
+        return self
+
+    def with_max_tokens(self, max_tokens):
+        return self
+
+    async def send_message(self, message):
+        occurrence = self._sent[message.text] = self._sent.get(message.text, 0) + 1
+        rng = random.Random(f"{self.seed}|{message.text}|{occurrence}")
+        await asyncio.sleep(max(0.0, rng.gauss(self.latency, self.jitter)))
+        if rng.random() < self.failure_rate:
+            raise RuntimeError("fake LLM failure")
+        if '"ideas"' in self.system_message:
+            answer = {"ideas": [
+                {
+                    "title": f"🔥 Ideia {i + 1}",
+                    "script": "1. Gancho\n2. Desenvolvimento\n3. Valor\n4. Call to action",
+                    "content_type": "Reels",
+                    "hashtags": ["#dica", "#conteudo", "#viral", "#brasil"],
+                }
+                for i in range(5)
+            ]}
+        else:
+            answer = {
+                "analysis": "Análise", "recommendations": [f"Recomendação {i}" for i in range(6)],
+                "best_posting_times": ["09:00", "12:00", "19:00"],
+                "audience_insights": "Audiência", "content_performance": "Conteúdo",
+            }
+        text = "```json\n" + json.dumps(answer, ensure_ascii=False) + "\n```"
+        if rng.random() < self.malformed_rate:
+            return text[:len(text) // 2]
+        return text
+
+
+def load_server(args):
+    """Import server.py against the chosen database, with the fake LLM in place."""
+    db_name = f"shadoom_bench_{uuid.uuid4().hex[:8]}"
+    os.environ.update(DB_NAME=db_name, GEMINI_API_KEY="bench", PREWARM_TOP_TOPICS="0", LOG_LEVEL="WARNING")
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    if args.mongo == "mongomock":
+        import motor.motor_asyncio
+        from mongomock_motor import AsyncMongoMockClient
+        motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+    import server
+
+    server.LlmChat = FakeLlmChat
+    server.UserMessage = FakeUserMessage
+    # Plan caps would turn most generate-ideas calls into 403s; this measures the LLM path
+    server.IDEAS_PLAN_LIMITS = {}
+    return server
+
+
+def parse_mix(spec):
+    mix = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint in --mix: {name.strip()!r} (expected one of {', '.join(ENDPOINTS)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+async def signup(client, users, rng):
+    suffix = uuid.UUID(int=rng.getrandbits(128)).hex[:12]
+    response = await client.post("/api/users", json={"email": f"bench-{suffix}@bench.test", "name": f"Bench {suffix}"})
+    if response.status_code == 200:
+        users.append(response.json()["id"])
+    return response
+
+
+async def generate_ideas(client, users, rng):
+    return await client.post("/api/generate-ideas", json={"user_id": rng.choice(users), "topic": rng.choice(TOPICS)})
+
+
+async def list_ideas(client, users, rng):
+    return await client.get(f"/api/ideas/{rng.choice(users)}", params={"limit": 20})
+
+
+async def dashboard(client, users, rng):
+    return await client.get("/api/admin/dashboard")
+
+
+OPERATIONS = {"signup": signup, "generate_ideas": generate_ideas, "list_ideas": list_ideas, "dashboard": dashboard}
+
+
+def percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(ms for ms, _ in samples)
+    statuses = {}
+    for _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    errors = sum(n for status, n in statuses.items() if not status.startswith("2"))
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4),
+        "status": statuses,
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+
+async def run_load(client, args):
+    users = []
+    rng = random.Random(args.seed)
+    for i in range(args.users):
+        await signup(client, users, random.Random(f"{args.seed}|user|{i}"))
+    if not users:
+        raise SystemExit("Could not create any user; is the database reachable?")
+
+    mix = parse_mix(args.mix)
+    plan = rng.choices(list(mix), weights=list(mix.values()), k=args.requests)
+    samples = {name: [] for name in mix}
+    next_index = iter(range(args.requests))
+
+    async def worker():
+        for i in next_index:
+            name = plan[i]
+            started = time.perf_counter()
+            try:
+                status = (await OPERATIONS[name](client, users, random.Random(f"{args.seed}|{i}"))).status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            samples[name].append(((time.perf_counter() - started) * 1000, status))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    everything = [sample for endpoint in samples.values() for sample in endpoint]
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "total": summarize(everything, elapsed),
+        "endpoints": {name: summarize(endpoint, elapsed) for name, endpoint in samples.items() if endpoint},
+    }
+
+
+async def drop_database(server, args):
+    # Before the app's shutdown closes the client
+    if args.mongo == "local":
+        await server.client.drop_database(server.db.name)
+
+
+async def serve_in_process(server, args):
+    async with server.app.router.lifespan_context(server.app):
+        transport = httpx.ASGITransport(app=server.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout) as client:
+                return await run_load(client, args)
+        finally:
+            await drop_database(server, args)
+
+
+async def serve_with_uvicorn(server, args):
+    import uvicorn
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    uvicorn_server = uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(uvicorn_server.serve())
+    try:
+        while not uvicorn_server.started:
+            if serving.done():
+                serving.result()
+                raise SystemExit("uvicorn exited before it started")
+            await asyncio.sleep(0.05)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=args.timeout) as client:
+            return await run_load(client, args)
+    finally:
+        if uvicorn_server.started:
+            await drop_database(server, args)
+        uvicorn_server.should_exit = True
+        await serving
+
+
+def compare(results, baseline, tracked, threshold):
+    """Return one message per tracked metric that got worse than ``baseline`` by more than ``threshold``."""
+    regressions = []
+    for name, current in results["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if previous is None:
+            continue
+        for metric in tracked:
+            before, after = previous.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > threshold:
+                regressions.append(f"{name}.{metric}: {before} -> {after} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--serve", choices=("asgi", "uvicorn"), default="asgi", help="call the app directly or over HTTP")
+    parser.add_argument("--mongo", choices=("mongomock", "local"), default="mongomock", help="local uses MONGO_URL")
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests")
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent clients")
+    parser.add_argument("--users", type=int, default=50, help="users created before the measured requests")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"endpoint weights (default {DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=60.0, help="client timeout per request (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="mean fake LLM latency (s)")
+    parser.add_argument("--llm-jitter", type=float, default=0.25, help="standard deviation of that latency (s)")
+    parser.add_argument("--llm-malformed-rate", type=float, default=0.05, help="share of answers cut mid-JSON")
+    parser.add_argument("--llm-failure-rate", type=float, default=0.02, help="share of calls raising an error")
+    parser.add_argument("--save", help="also write the results to this file")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--track", default="p95_ms,p99_ms,throughput_rps", help="metrics compared with --baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative degradation (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    FakeLlmChat.seed = args.seed
+    FakeLlmChat.latency = args.llm_latency
+    FakeLlmChat.jitter = args.llm_jitter
+    FakeLlmChat.malformed_rate = args.llm_malformed_rate
+    FakeLlmChat.failure_rate = args.llm_failure_rate
+
+    server = load_server(args)
+    run = serve_with_uvicorn if args.serve == "uvicorn" else serve_in_process
+
+    results = asyncio.run(run(server, args))
+    results["config"] = {key: value for key, value in vars(args).items() if key not in ("save", "baseline")}
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2, ensure_ascii=False))
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(results, baseline, [m.strip() for m in args.track.split(",") if m.strip()], args.threshold)
+        if regressions:
+            print("Regressions past {:.0%}:\n  ".format(args.threshold) + "\n  ".join(regressions), file=sys.stderr)
+            sys.exit(1)
+        print("No regressions past {:.0%}".format(args.threshold), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for list-endpoint serialization.
+
+Measures CPU time per page for the old path (a Pydantic model per row,
+revalidated and serialized through response_model, rendered by
+JSONResponse) against serialization.page_response (projected documents
+encoded by orjson). Documents are generated in memory, so no database is
+needed; results are printed as JSON.
+
+    python benchmarks/serialization.py --rows 100 --pages 500
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+# server.py reads these at import time; the Motor client is only created at startup, so nothing is contacted
+for name, value in (("MONGO_URL", "mongodb://localhost:27017"), ("DB_NAME", "shadoom_bench"), ("GEMINI_API_KEY", "bench")):
+    os.environ.setdefault(name, value)
+import serialization  # noqa: E402
+from server import ContentIdea, ContentIdeaPage, PaymentRecord, User  # noqa: E402
+
+
+def make_docs(model, rows):
+    now = datetime.utcnow()
+    docs = []
+    for i in range(rows):
+        created_at = now - timedelta(minutes=i)
+        if model is User:
+            doc = User(email=f"user{i}@bench.test", name=f"User {i}", instagram_handle=f"user{i}", created_at=created_at)
+        elif model is PaymentRecord:
+            doc = PaymentRecord(
+                user_id=str(uuid.uuid4()), amount=29.90, currency="BRL", payment_method="card",
+                payment_data={"card_number": "4111111111111111"}, status="completed", created_at=created_at
+            )
+        else:
+            doc = ContentIdea(
+                user_id=str(uuid.uuid4()), topic="fitness", title=f"🔥 Ideia {i}",
+                script="1. Gancho\n2. Desenvolvimento\n3. Valor\n4. Call to action",
+                content_type="Reels", hashtags=["#fitness", "#treino", "#saude", "#vidasaudavel"], created_at=created_at
+            )
+        docs.append(doc.dict())
+    return docs
+
+
+def old_path(docs, model, page_adapter):
+    # What the handlers did before: build models, then FastAPI validates and serializes the response
+    content = {"items": [model(**doc) for doc in docs], "next_cursor": None}
+    if page_adapter is not None:
+        content = page_adapter.dump_python(page_adapter.validate_python(content), mode="json")
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def new_path(docs, model, page_adapter):
+    return serialization.page_response(docs, model, None).body
+
+
+def measure(fn, docs, model, page_adapter, pages):
+    samples = []
+    for _ in range(pages):
+        started = time.process_time()
+        fn(docs, model, page_adapter)
+        samples.append(time.process_time() - started)
+    samples.sort()
+    return {
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+        "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100, help="documents per page")
+    parser.add_argument("--pages", type=int, default=500, help="pages serialized per measurement")
+    args = parser.parse_args()
+
+    cases = {
+        "admin_users": (User, None),
+        "admin_payments": (PaymentRecord, None),
+        "user_ideas": (ContentIdea, TypeAdapter(ContentIdeaPage)),
+    }
+    results = {"rows": args.rows, "pages": args.pages}
+    for name, (model, page_adapter) in cases.items():
+        docs = make_docs(model, args.rows)
+        assert json.loads(old_path(docs, model, page_adapter)) == json.loads(new_path(docs, model, page_adapter))
+        before = measure(old_path, docs, model, page_adapter, args.pages)
+        after = measure(new_path, docs, model, page_adapter, args.pages)
+        results[name] = {"before": before, "after": after, "speedup": round(before["mean_ms"] / after["mean_ms"], 1)}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the generate-ideas write path.
+
+Compares the original per-idea insert_one loop against the batched
+save_generated_ideas() helper and reports MongoDB round trips per request
+and p50/p99 latency as JSON. Needs a reachable MongoDB (MONGO_URL, default
+mongodb://localhost:27017); it writes to a throwaway database.
+
+    python benchmarks/write_path.py --requests 500 --ideas 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from persistence import save_generated_ideas  # noqa: E402
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        if event.command_name in ("insert", "update", "commitTransaction"):
+            self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def make_ideas(user_id, count):
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "topic": "fitness",
+            "title": f"Ideia {i}",
+            "script": "1. Gancho\n2. Desenvolvimento\n3. Valor\n4. CTA",
+            "content_type": "Reels",
+            "hashtags": ["#fitness", "#treino"],
+            "created_at": datetime.utcnow(),
+        }
+        for i in range(count)
+    ]
+
+
+async def before(db, user_id, docs):
+    for doc in docs:
+        await db.content_ideas.insert_one(doc)
+    await db.users.update_one({"id": user_id}, {"$inc": {"ideas_generated": len(docs)}})
+
+
+def after(mode):
+    async def run(db, user_id, docs):
+        await save_generated_ideas(db, user_id, docs, mode)
+    return run
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def measure(db, counter, write, requests, ideas):
+    latencies = []
+    counter.count = 0
+    for _ in range(requests):
+        user_id = str(uuid.uuid4())
+        await db.users.insert_one({"id": user_id, "ideas_generated": 0})
+        counter.count -= 1  # the setup insert is not part of the write path
+        docs = make_ideas(user_id, ideas)
+        start = time.perf_counter()
+        await write(db, user_id, docs)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "round_trips_per_request": counter.count / requests,
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--ideas", type=int, default=5)
+    parser.add_argument("--transaction", action="store_true", help="also measure the transaction write mode")
+    args = parser.parse_args()
+
+    counter = CommandCounter()
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"), event_listeners=[counter])
+    db = client[f"shadoom_bench_{uuid.uuid4().hex[:8]}"]
+    try:
+        results = {
+            "before": await measure(db, counter, before, args.requests, args.ideas),
+            "after_batch": await measure(db, counter, after("batch"), args.requests, args.ideas),
+        }
+        if args.transaction:
+            results["after_transaction"] = await measure(db, counter, after("transaction"), args.requests, args.ideas)
+        print(json.dumps(results, indent=2))
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -74,8 +74,10 @@ const AdminPanel = ({ onBack }) => {
 
   const loadUsers = async () => {
     try {
-      const usersResponse = await axios.get(`${API}/admin/users`);
-      setUsers(usersResponse.data);
+      const usersResponse = await axios.get(`${API}/admin/users`, {
+        params: { fields: 'name,email,plan,ideas_generated' }
+      });
+      setUsers(usersResponse.data.items);
     } catch (error) {
       console.error('Error loading users:', error);
     }
@@ -83,8 +85,10 @@ const AdminPanel = ({ onBack }) => {
 
   const loadPayments = async () => {
     try {
-      const paymentsResponse = await axios.get(`${API}/admin/payments`);
-      setPayments(paymentsResponse.data);
+      const paymentsResponse = await axios.get(`${API}/admin/payments`, {
+        params: { fields: 'user_id,amount,payment_method,status' }
+      });
+      setPayments(paymentsResponse.data.items);
     } catch (error) {
       console.error('Error loading payments:', error);
     }
@@ -738,7 +742,7 @@ function App() {
   const loadUserIdeas = async (userId) => {
     try {
       const response = await axios.get(`${API}/ideas/${userId}`);
-      setIdeas(response.data);
+      setIdeas(response.data.items);
     } catch (error) {
       console.error('Error loading ideas:', error);
     }